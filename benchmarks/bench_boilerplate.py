@@ -0,0 +1,65 @@
+"""Main-content extraction vs. the full page text on the saved fixture corpus.
+
+Reports characters and tokens removed by ``clean_html(..., main_content=True)``,
+the share of expected answer facts (from ``fixtures/queries.json``) that
+survive, and the extra cleaning time.
+
+Usage: python -m benchmarks.bench_boilerplate [repeat]
+"""
+import json
+import os
+import sys
+import time
+
+from scrape import clean_html
+from tokens import estimate_tokens
+from benchmarks.common import percentile
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def median_time(func, *args, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return percentile(timings, 50)
+
+
+def main(repeat=20):
+    with open(os.path.join(FIXTURES, "queries.json"), "r", encoding="utf-8") as handle:
+        cases = json.load(handle)
+    facts = {}
+    for case in cases:
+        facts.setdefault(case["page"], []).extend(case["expected"])
+
+    print(f"{'page':<16} {'chars':>15} {'tokens':>13} {'facts kept':>11} {'full ms':>8} {'main ms':>8}")
+    totals = {"chars": [0, 0], "tokens": [0, 0], "facts": [0, 0]}
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as handle:
+            html = handle.read()
+        full = clean_html(html)
+        main_text = clean_html(html, main_content=True)
+        expected = facts.get(name, [])
+        kept = sum(1 for fact in expected if fact in main_text)
+
+        for key, before, after in (("chars", len(full), len(main_text)),
+                                   ("tokens", estimate_tokens(full), estimate_tokens(main_text)),
+                                   ("facts", len(expected), kept)):
+            totals[key][0] += before
+            totals[key][1] += after
+        print(f"{name:<16} {len(full):>7}->{len(main_text):<7} "
+              f"{estimate_tokens(full):>6}->{estimate_tokens(main_text):<6} {kept:>5}/{len(expected):<5} "
+              f"{median_time(clean_html, html, repeat=repeat) * 1000:>8.2f} "
+              f"{median_time(clean_html, html, True, repeat=repeat) * 1000:>8.2f}")
+
+    chars, tokens, kept = totals["chars"], totals["tokens"], totals["facts"]
+    print(f"\ntotal: {1 - chars[1] / chars[0]:.0%} fewer characters, {1 - tokens[1] / tokens[0]:.0%} fewer tokens, "
+          f"{kept[1]}/{kept[0]} answer facts kept")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,66 @@
+"""Microbenchmark: linear split_dom_content vs. the original string-concatenating version.
+
+Usage: python -m benchmarks.bench_chunk [line_count ...]
+"""
+import random
+import sys
+import time
+
+from scrape import split_dom_content
+from benchmarks.common import percentile
+
+
+def legacy_split_dom_content(dom_content, max_length=4000):
+    """The original implementation, kept as the baseline"""
+    if not dom_content:
+        return []
+    if len(dom_content) <= max_length:
+        return [dom_content]
+    chunks = []
+    current_chunk = ""
+    for line in dom_content.split("\n"):
+        if len(current_chunk + line) > max_length and current_chunk:
+            chunks.append(current_chunk.strip())
+            current_chunk = line + "\n"
+        else:
+            current_chunk += line + "\n"
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    return chunks if chunks else [dom_content]
+
+
+def synthetic_text(line_count, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(line_count):
+        words = rng.randint(2, 25)
+        lines.append(" ".join(f"word{rng.randint(0, 500)}" for _ in range(words)))
+        if i % 2000 == 1999:
+            # An occasional minified blob far longer than any chunk
+            lines.append("Sentence number one. " * 600)
+    return "\n".join(lines)
+
+
+def best_of(func, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return percentile(timings, 50), result
+
+
+def main(line_counts, max_lengths=(4000, 100000)):
+    # Large budgets (token-sized contexts) are where repeated concatenation hurts most
+    print(f"{'lines':>8} {'budget':>7} {'impl':>8} {'median ms':>10} {'chunks':>7} {'max len':>8}")
+    for line_count in line_counts:
+        text = synthetic_text(line_count)
+        for max_length in max_lengths:
+            for name, func in (("legacy", legacy_split_dom_content), ("linear", split_dom_content)):
+                seconds, chunks = best_of(func, text, max_length)
+                print(f"{line_count:>8} {max_length:>7} {name:>8} {seconds * 1000:>10.2f} "
+                      f"{len(chunks):>7} {max(map(len, chunks)):>8}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
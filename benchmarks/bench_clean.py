@@ -0,0 +1,56 @@
+"""Compare the two-step extract/clean path with clean_html and iter_clean_lines.
+
+Usage: python -m benchmarks.bench_clean [size_mb ...]
+"""
+import sys
+
+from bs4 import BeautifulSoup
+
+from scrape import extract_body_content, clean_html, iter_clean_lines
+from benchmarks.common import synthetic_page, measure, peak_rss_growth
+
+
+def legacy_clean_body_content(body_content):
+    """The original html.parser based clean_body_content, kept as the baseline"""
+    if not body_content:
+        return ""
+    soup = BeautifulSoup(body_content, "html.parser")
+    for element in soup(["script", "style", "noscript", "iframe", "embed", "object", "form", "svg"]):
+        element.extract()
+    text = soup.get_text(separator="\n")
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return "\n".join(chunk for chunk in chunks if chunk)
+
+
+def two_step(html):
+    return legacy_clean_body_content(extract_body_content(html))
+
+
+def streaming(html):
+    for _ in iter_clean_lines(html):
+        pass
+
+
+def main(sizes_mb):
+    # tracemalloc only sees Python allocations; the RSS column also covers libxml2
+    print(f"{'size':>8} {'path':>10} {'ms/MB':>10} {'py peak MB/MB':>14} {'rss peak MB/MB':>15}")
+    for size_mb in sizes_mb:
+        html = synthetic_page(int(size_mb * 1024 * 1024))
+        mb = len(html.encode("utf-8")) / (1024 * 1024)
+
+        paths = (("two-step", two_step), ("clean_html", clean_html), ("streaming", streaming))
+        # Fork before timing so children do not inherit heap freed by earlier runs
+        rss_growth = {name: peak_rss_growth(func, html) for name, func in paths}
+        for name, func in paths:
+            seconds, peak = measure(func, html)
+            rss = rss_growth[name]
+            rss_text = f"{rss / (1024 * 1024) / mb:>15.2f}" if rss is not None else f"{'n/a':>15}"
+            print(f"{size_mb:>6}MB {name:>10} {seconds * 1000 / mb:>10.1f} {peak / (1024 * 1024) / mb:>14.2f} {rss_text}")
+        expected = two_step(html)
+        identical = expected == clean_html(html) == "\n".join(iter_clean_lines(html))
+        print(f"{'':>8} identical output: {identical}")
+
+
+if __name__ == "__main__":
+    main([float(arg) for arg in sys.argv[1:]] or [0.25, 1, 4])
@@ -0,0 +1,110 @@
+"""Near-duplicate elimination: characters/tokens saved, content kept, speed and memory.
+
+1. Within one page, on every fixture in ``benchmarks/fixtures``, with the
+   answer facts from ``queries.json`` that survive.
+2. Across a session of pages from one templated site (shared menu and
+   footer, a notice whose date changes per page, unique body text),
+   with the share of unique body lines that survive.
+3. Throughput on a large generated page, and the fingerprint count and
+   traced memory of a long session against a small ``max_fingerprints``.
+
+Usage: python -m benchmarks.bench_dedup [session_pages]
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from dedup import Deduplicator
+from scrape import clean_html
+from tokens import estimate_tokens
+from benchmarks.bench_retrieval import FIXTURES
+from benchmarks.common import synthetic_page
+
+_WORDS = (
+    "river trail summit jacket waterproof lightweight breathable insulated merino fleece alpine "
+    "coastal canyon forest desert glacier meadow ridge valley harbor island lantern compass"
+).split()
+
+
+def site_page(index, rng):
+    """One page of a templated shop: shared chrome around a unique article"""
+    menu = "".join(f"<li><a href='/c/{i}'>Category {i}</a></li>" for i in range(14))
+    notice = (f"<div class='notice'>We use cookies and similar technologies to run this store, remember your cart and "
+              f"measure how our pages perform. Prices are valid until {rng.randint(1, 28)} March and apply to "
+              f"online orders only, while stocks last.</div>")
+    body = "".join(
+        "<p>" + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(12, 30))) + f" (item {index}-{n})</p>"
+        for n in range(rng.randint(6, 14))
+    )
+    footer = (
+        "<footer><p>Northwind Outfitters, 18 Harbor Street, Portland, open daily from 9 am to 8 pm</p>"
+        "<p>Sign up for our newsletter to hear about sales, events and new gear before anyone else</p>"
+        f"<p>Copyright {2020 + index % 5} Northwind Outfitters. All rights reserved worldwide.</p>"
+        "<ul><li>Privacy</li><li>Terms</li><li>Careers</li><li>Press</li><li>Contact</li></ul></footer>"
+    )
+    return f"<html><body><nav><ul>{menu}</ul></nav>{notice}<h1>Page {index}</h1>{body}{footer}</body></html>"
+
+
+def within_pages():
+    with open(os.path.join(FIXTURES, "queries.json"), "r", encoding="utf-8") as handle:
+        cases = json.load(handle)
+    print(f"{'page':<16} {'chars':>15} {'tokens':>13} {'facts kept':>11}")
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as handle:
+            text = clean_html(handle.read())
+        kept = Deduplicator().dedup(text, name)
+        facts = [fact for case in cases if case["page"] == name for fact in case["expected"] if fact in text]
+        print(f"{name:<16} {len(text):>7}->{len(kept):<7} {estimate_tokens(text):>6}->{estimate_tokens(kept):<6} "
+              f"{sum(fact in kept for fact in facts):>5}/{len(facts):<5}")
+
+
+def session(pages):
+    rng = random.Random(0)
+    deduplicator = Deduplicator()
+    unique, survived = 0, 0
+    started = time.perf_counter()
+    for index in range(pages):
+        text = clean_html(site_page(index, rng))
+        kept = deduplicator.dedup(text, f"/page/{index}")
+        body = [line for line in text.split("\n") if f"(item {index}-" in line]
+        unique += len(body)
+        survived += sum(line in kept for line in body)
+    elapsed = time.perf_counter() - started
+    stats = deduplicator.stats()
+    print(f"\nsession of {pages} templated pages: {stats['chars_saved'] / stats['chars_in']:.0%} of characters "
+          f"({stats['chars_saved']}) and {stats['tokens_saved'] / stats['tokens_in']:.0%} of tokens "
+          f"({stats['tokens_saved']}) dropped; exact {stats['exact']}, near {stats['near']}, runs {stats['runs']}; "
+          f"unique body lines kept {survived}/{unique}; {elapsed / pages * 1000:.2f} ms/page incl. cleaning")
+
+
+def throughput_and_memory():
+    text = clean_html(synthetic_page(2 * 1024 * 1024))
+    started = time.perf_counter()
+    Deduplicator().dedup(text)
+    elapsed = time.perf_counter() - started
+    print(f"\nthroughput: {len(text) / elapsed / 1e6:.1f} MB/s of cleaned text ({len(text.splitlines())} lines)")
+
+    deduplicator = Deduplicator(max_fingerprints=10_000)
+    tracemalloc.start()
+    for seed in range(40):
+        deduplicator.dedup(clean_html(synthetic_page(200_000, seed=seed)), seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = deduplicator.stats()
+    print(f"memory: {stats['lines']} lines over {stats['documents']} pages, {stats['fingerprints']} fingerprints "
+          f"held (cap 3 x 10000), traced peak {peak / 1e6:.1f} MB")
+
+
+def main(pages=50):
+    within_pages()
+    session(pages)
+    throughput_and_memory()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,48 @@
+"""Exercise GroqClient against the local stub: connection reuse, retries and latency metrics.
+
+Usage: python -m benchmarks.bench_groq_client [request_count]
+"""
+import sys
+import time
+
+import requests
+
+from groq_client import GroqClient
+from benchmarks.stub_servers import StubLLMServer
+
+MESSAGES = [{"role": "user", "content": "Content: hello\n\nQuery: greet"}]
+
+
+def per_call_post(base_url, count):
+    """The old pattern: a fresh connection for every request"""
+    for _ in range(count):
+        requests.post(base_url + "/chat/completions", json={"model": "m", "messages": MESSAGES}, timeout=20)
+
+
+def pooled(client, count):
+    for _ in range(count):
+        client.chat(MESSAGES, model="m")
+
+
+def main(count):
+    with StubLLMServer() as stub:
+        client = GroqClient(api_key="stub", base_url=stub.base_url, rpm=0, tpm=0)
+        for name, run in (("requests.post", lambda: per_call_post(stub.base_url, count)),
+                          ("GroqClient", lambda: pooled(client, count))):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            print(f"{name:>14}: {count} calls in {elapsed:.3f}s ({elapsed * 1000 / count:.2f} ms/call)")
+        print("metrics:", client.metrics())
+
+    # Two 429s (one with Retry-After) and a 503 must be retried transparently
+    with StubLLMServer(failures=[(429, 1), (429, None), (503, None)]) as stub:
+        client = GroqClient(api_key="stub", base_url=stub.base_url, rpm=0, tpm=0, backoff_base=0.05)
+        started = time.perf_counter()
+        answer = client.chat(MESSAGES, model="m")
+        print(f"retried to success in {time.perf_counter() - started:.2f}s "
+              f"after {client.metrics()['retries']} retries: {answer.splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,91 @@
+"""Cold-start import benchmark with a budget, for catching startup regressions.
+
+Imports the modules every Streamlit rerun and CLI run loads in a fresh
+interpreter under ``python -X importtime``, reports the median cost and the
+heaviest dependencies, and exits non-zero when the median exceeds the
+budget or when a lazily loaded backend (Selenium, langchain, bs4) was
+imported eagerly.
+
+Usage: python -m benchmarks.bench_import [--budget-ms 350] [--repeat 5] [module ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = ("scrape", "parse", "cli")
+
+# Only loaded on first use; importing any of them at startup is a regression
+LAZY_MODULES = ("selenium", "langchain_core", "langchain_ollama", "bs4")
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "350"))
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(modules):
+    """Import ``modules`` in a fresh interpreter; returns ([(self_us, cumulative_us, depth, name)], eager lazies)"""
+    code = (
+        f"import {', '.join(modules)}; import sys; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    eager = [name for name in completed.stdout.strip().split(",") if name]
+    return rows, eager
+
+
+def import_cost_ms(rows, modules):
+    """Cumulative import time of the requested top-level modules"""
+    return sum(cumulative for _, cumulative, depth, name in rows if depth == 0 and name in modules) / 1000.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time against a budget")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest modules to list")
+    args = parser.parse_args(argv)
+
+    import_profile(args.modules)  # warm the .pyc and OS file caches
+    timings = []
+    for _ in range(args.repeat):
+        rows, eager = import_profile(args.modules)
+        timings.append(import_cost_ms(rows, args.modules))
+    median = statistics.median(timings)
+
+    print(f"import {', '.join(args.modules)}: median {median:.1f} ms, "
+          f"min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.repeat} runs")
+    for module in args.modules:
+        cost = next((cumulative for _, cumulative, depth, name in rows if depth == 0 and name == module), 0)
+        print(f"  {module:<20} {cost / 1000.0:>8.1f} ms")
+
+    print("\nHeaviest modules by self time (last run):")
+    for self_us, cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {name:<40} self {self_us / 1000.0:>7.1f} ms  cumulative {cumulative_us / 1000.0:>7.1f} ms")
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"\nFAIL: median {median:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print(f"\nOK: within the {args.budget_ms:.0f} ms budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Markdown output vs. the plain-text cleaners: throughput and prompt size.
+
+Throughput compares the original two-step cleaner, ``clean_html`` and
+``clean_html(..., output="markdown")`` on synthetic pages. The fixture
+table reports lines, characters and tokens of both outputs and whether
+every expected answer fact survives in the Markdown.
+
+Usage: python -m benchmarks.bench_markdown [size_mb ...]
+"""
+import json
+import os
+import sys
+
+from scrape import clean_html
+from tokens import estimate_tokens
+from benchmarks.bench_clean import two_step
+from benchmarks.common import synthetic_page, measure
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def markdown(html):
+    return clean_html(html, output="markdown")
+
+
+def throughput(sizes_mb):
+    print(f"{'size':>8} {'path':>10} {'MB/s':>8}")
+    for size_mb in sizes_mb:
+        html = synthetic_page(int(size_mb * 1024 * 1024))
+        mb = len(html.encode("utf-8")) / (1024 * 1024)
+        for name, func in (("two-step", two_step), ("clean_html", clean_html), ("markdown", markdown)):
+            seconds, _ = measure(func, html)
+            print(f"{size_mb:>6}MB {name:>10} {mb / seconds:>8.1f}")
+
+
+def fixtures():
+    with open(os.path.join(FIXTURES, "queries.json"), "r", encoding="utf-8") as handle:
+        cases = json.load(handle)
+    facts = {}
+    for case in cases:
+        facts.setdefault(case["page"], []).extend(case["expected"])
+
+    print(f"\n{'page':<16} {'lines':>11} {'chars':>15} {'tokens':>13} {'facts kept':>11}")
+    totals = [0, 0]
+    for name in sorted(os.listdir(FIXTURES)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as handle:
+            html = handle.read()
+        text, md = clean_html(html), markdown(html)
+        expected = facts.get(name, [])
+        kept = sum(1 for fact in expected if fact in md)
+        totals[0] += estimate_tokens(text)
+        totals[1] += estimate_tokens(md)
+        print(f"{name:<16} {text.count(chr(10)) + 1:>5}->{md.count(chr(10)) + 1:<5} "
+              f"{len(text):>7}->{len(md):<7} {estimate_tokens(text):>6}->{estimate_tokens(md):<6} "
+              f"{kept:>5}/{len(expected):<5}")
+    print(f"\ntotal tokens: {totals[0]} -> {totals[1]} ({totals[1] / totals[0] - 1:+.0%})")
+
+
+def main(sizes_mb):
+    throughput(sizes_mb)
+    fixtures()
+
+
+if __name__ == "__main__":
+    main([float(arg) for arg in sys.argv[1:]] or [0.25, 1, 4])
@@ -0,0 +1,65 @@
+"""Instrumentation overhead: cost per recorded event and per instrumented stage call.
+
+Times ``inc``, ``observe`` and ``timer`` on an enabled and a disabled
+registry from several threads, then compares ``clean_html`` and
+``split_dom_content`` with metrics on and off.
+
+Usage: python -m benchmarks.bench_metrics [events] [threads]
+"""
+import sys
+import threading
+import time
+
+import metrics
+from scrape import clean_html, split_dom_content
+from benchmarks.common import synthetic_page, measure
+
+
+def per_event_ns(func, events, threads):
+    def worker():
+        for _ in range(events):
+            func()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return (time.perf_counter() - started) / (events * threads) * 1e9
+
+
+def main(events=200_000, threads=4):
+    print(f"{'operation':<32} {'enabled ns':>11} {'disabled ns':>12}")
+    registries = {True: metrics.Registry(enabled=True), False: metrics.Registry(enabled=False)}
+
+    def timed(registry):
+        with registry.timer("stage_seconds", backend="groq"):
+            pass
+
+    operations = (
+        ("inc()", lambda registry: registry.inc("events_total")),
+        ("inc(labels)", lambda registry: registry.inc("events_total", cache="llm", result="hit")),
+        ("observe(labels)", lambda registry: registry.observe("stage_seconds", 0.02, backend="groq")),
+        ("timer(labels)", timed),
+    )
+    for name, operation in operations:
+        cost = {enabled: per_event_ns(lambda: operation(registry), events, threads)
+                for enabled, registry in registries.items()}
+        print(f"{name:<32} {cost[True]:>11.0f} {cost[False]:>12.0f}")
+
+    html = synthetic_page(256 * 1024)
+    text = clean_html(html)
+    registry = metrics.get_default_registry()
+    print(f"\n{'stage (256 KB page)':<32} {'enabled ms':>11} {'disabled ms':>12}")
+    for name, func, args in (("clean_html", clean_html, (html,)), ("split_dom_content", split_dom_content, (text, 2000))):
+        timings = {}
+        for enabled in (True, False):
+            registry.enabled = enabled
+            timings[enabled], _ = measure(func, *args, repeat=20)
+        registry.enabled = True
+        print(f"{name:<32} {timings[True] * 1000:>11.3f} {timings[False] * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
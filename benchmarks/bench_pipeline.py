@@ -0,0 +1,69 @@
+"""Sequential fetch/clean/parse loop vs. the async pipeline, fully offline.
+
+Pages come from a local stub HTTP server and answers from a stub
+chat-completions endpoint, both with configurable latency.
+
+Usage: python -m benchmarks.bench_pipeline [page_count] [llm_latency_seconds]
+"""
+import os
+import sys
+import time
+
+# Point every client at the stubs and lift the account rate limits before importing the app
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ["GROQ_RPM"] = "0"
+os.environ["GROQ_TPM"] = "0"
+
+import http_fetch  # noqa: E402
+from llm_cache import get_response_cache  # noqa: E402
+from parse import parse_chunks  # noqa: E402
+from pipeline import run_pipeline  # noqa: E402
+from scrape import clean_html  # noqa: E402
+from benchmarks.common import synthetic_page, percentile  # noqa: E402
+from benchmarks.stub_servers import StubLLMServer, StubPageServer  # noqa: E402
+
+QUERY = "List all projects with technologies"
+
+
+def sequential(jobs):
+    latencies = []
+    for url, query in jobs:
+        started = time.perf_counter()
+        html = http_fetch.fetch(url).text
+        parse_chunks(clean_html(html), query, chunk_size=4000, max_in_flight=1)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(name, elapsed, latencies, count):
+    print(f"{name:>12}: {count} pages in {elapsed:.2f}s ({count / elapsed:.1f} pages/s), "
+          f"p50 {percentile(latencies, 50):.3f}s p95 {percentile(latencies, 95):.3f}s")
+
+
+def main(page_count, llm_latency, page_latency=0.05):
+    pages = {f"/page/{i}": synthetic_page(60_000, seed=i) for i in range(page_count)}
+    with StubPageServer(pages, latency=page_latency) as site, StubLLMServer(latency=llm_latency) as llm:
+        os.environ["GROQ_BASE_URL"] = llm.base_url
+        jobs = [(site.url(path), QUERY) for path in pages]
+
+        get_response_cache().clear()
+        started = time.perf_counter()
+        latencies = sequential(jobs)
+        report("sequential", time.perf_counter() - started, latencies, page_count)
+
+        get_response_cache().clear()
+        started = time.perf_counter()
+        results = run_pipeline(jobs, fetch_concurrency=8, parse_concurrency=8, llm_in_flight=16,
+                               llm_base_url=llm.base_url, escalate=False)
+        elapsed = time.perf_counter() - started
+        report("pipeline", elapsed, [r["elapsed"] for r in results], page_count)
+
+        failed = [r for r in results if r["status"] != "ok"]
+        if failed:
+            print("failures:", failed[:3])
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    main(count, latency)
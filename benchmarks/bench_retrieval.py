@@ -0,0 +1,100 @@
+"""Relevance pre-filter: tokens sent, LLM latency and answer parity on saved fixture pages.
+
+Each query in ``benchmarks/fixtures/queries.json`` lists facts a correct
+answer must contain. The stub LLM plays a perfect extractor (it answers
+with every content line holding one of those facts) and charges prefill
+time per prompt token, so recall reflects only what retrieval kept and
+latency scales with what was sent.
+
+Usage: python -m benchmarks.bench_retrieval [budget_tokens ...] [--ms-per-token 0.5]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ["GROQ_RPM"] = "0"
+os.environ["GROQ_TPM"] = "0"
+
+from llm_cache import get_response_cache  # noqa: E402
+from parse import count_prompt_tokens, parse_with_groq  # noqa: E402
+from retrieval import PASSAGE_TOKENS, RETRIEVAL_TOKENS, select_relevant  # noqa: E402
+from scrape import clean_html  # noqa: E402
+from benchmarks.stub_servers import StubLLMServer  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_cases():
+    with open(os.path.join(FIXTURES, "queries.json"), "r", encoding="utf-8") as handle:
+        cases = json.load(handle)
+    pages = {}
+    for case in cases:
+        if case["page"] not in pages:
+            with open(os.path.join(FIXTURES, case["page"]), "r", encoding="utf-8") as handle:
+                pages[case["page"]] = clean_html(handle.read())
+        case["content"] = pages[case["page"]]
+    return cases
+
+
+def extractor_for(cases):
+    """Stub answer: every content line that states one of the expected facts"""
+    facts = [fact for case in cases for fact in case["expected"]]
+
+    def answer(prompt):
+        content = prompt.split("Content: ", 1)[-1].split("\n\nQuery: ", 1)[0]
+        lines = [line for line in content.splitlines() if any(fact in line for fact in facts)]
+        return "\n".join(lines) or "No matching information found"
+    return answer
+
+
+def recall(answer, expected):
+    return sum(1 for fact in expected if fact in answer) / len(expected)
+
+
+def run_case(case, budget):
+    content = case["content"]
+    if budget:
+        content = select_relevant(content, case["query"], budget, passage_tokens=min(PASSAGE_TOKENS, budget // 4))
+    get_response_cache().clear()
+    started = time.perf_counter()
+    answer = parse_with_groq(content, case["query"])
+    return {
+        "tokens": count_prompt_tokens(content, case["query"]),
+        "latency": time.perf_counter() - started,
+        "recall": recall(answer, case["expected"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("budgets", nargs="*", type=int, default=[RETRIEVAL_TOKENS, 800, 400])
+    parser.add_argument("--ms-per-token", type=float, default=0.5, help="stub prefill cost per prompt token")
+    args = parser.parse_args(argv)
+
+    cases = load_cases()
+    with StubLLMServer(answer=extractor_for(cases), prompt_token_latency=args.ms_per_token / 1000) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        baseline = [run_case(case, None) for case in cases]
+
+        print(f"{'budget':>7} {'query':<58} {'tokens':>13} {'latency ms':>15} {'recall':>11}")
+        for budget in args.budgets:
+            results = [run_case(case, budget) for case in cases]
+            for case, full, filtered in zip(cases, baseline, results):
+                print(f"{budget:>7} {case['query'][:58]:<58} {full['tokens']:>6}->{filtered['tokens']:<6} "
+                      f"{full['latency'] * 1000:>7.1f}->{filtered['latency'] * 1000:<7.1f} "
+                      f"{full['recall']:>5.0%}->{filtered['recall']:<5.0%}")
+
+            sent = sum(result["tokens"] for result in results)
+            total = sum(result["tokens"] for result in baseline)
+            same = sum(1 for full, filtered in zip(baseline, results) if filtered["recall"] >= full["recall"])
+            print(f"{budget:>7} total: {total} -> {sent} prompt tokens ({1 - sent / total:.0%} fewer), "
+                  f"median latency {statistics.median(r['latency'] for r in baseline) * 1000:.1f} -> "
+                  f"{statistics.median(r['latency'] for r in results) * 1000:.1f} ms, "
+                  f"answer parity on {same}/{len(cases)} queries\n")
+
+
+if __name__ == "__main__":
+    main()
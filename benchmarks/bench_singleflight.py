@@ -0,0 +1,96 @@
+"""Request coalescing: origin fetches and LLM calls for identical concurrent requests.
+
+N threads scrape the same URL from a stub page server, then parse the same
+(content, query) pair against the stub LLM, once through the coalesced
+``scrape_website``/``parse_with_groq`` and once through the uncoalesced
+functions underneath. Finally several processes parse the same pair with
+SINGLEFLIGHT_DIR and LLM_CACHE_DIR pointing at shared temp directories.
+
+Usage: python -m benchmarks.bench_singleflight [threads] [processes]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ["GROQ_RPM"] = "0"
+os.environ["GROQ_TPM"] = "0"
+os.environ["SCRAPER_CACHE_DIR"] = ""
+
+import scrape  # noqa: E402
+from parse import parse_with_groq  # noqa: E402
+from singleflight import get_default_flight  # noqa: E402
+from benchmarks.common import synthetic_page  # noqa: E402
+from benchmarks.stub_servers import StubLLMServer, StubPageServer  # noqa: E402
+
+QUERY = "List all projects with technologies"
+
+
+def burst(func, count):
+    """Run ``func`` on ``count`` threads released at the same moment; returns wall time"""
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        func()
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def _process_parse(barrier, content, results):
+    barrier.wait()
+    results.put(parse_with_groq(content, QUERY))
+
+
+def main(threads=16, processes=4):
+    content = scrape.clean_html(synthetic_page(12000))
+    with StubPageServer({"/page": synthetic_page(200_000)}, latency=0.2) as site, \
+            StubLLMServer(latency=0.3) as llm:
+        os.environ["GROQ_BASE_URL"] = llm.base_url
+        url = site.url("/page")
+        print(f"{'operation':<28} {'callers':>8} {'origin calls':>13} {'wall ms':>9}")
+
+        for name, func in (("scrape (uncoalesced)", lambda: scrape._fetch_page(url, mode="http")),
+                           ("scrape_website", lambda: scrape.scrape_website(url, mode="http", use_cache=False))):
+            before = site.requests
+            seconds = burst(func, threads)
+            print(f"{name:<28} {threads:>8} {site.requests - before:>13} {seconds * 1000:>9.0f}")
+
+        for name, func in (("parse (uncoalesced)", lambda: parse_with_groq.__wrapped__(content, QUERY)),
+                           ("parse_with_groq", lambda: parse_with_groq(content, QUERY))):
+            before = len(llm.requests)
+            seconds = burst(func, threads)
+            print(f"{name:<28} {threads:>8} {len(llm.requests) - before:>13} {seconds * 1000:>9.0f}")
+
+        with tempfile.TemporaryDirectory() as shared:
+            # Spawned children read these at import time
+            os.environ["SINGLEFLIGHT_DIR"] = os.path.join(shared, "locks")
+            os.environ["LLM_CACHE_DIR"] = os.path.join(shared, "llm")
+            context = multiprocessing.get_context("spawn")
+            barrier, results = context.Barrier(processes), context.Queue()
+            children = [context.Process(target=_process_parse, args=(barrier, content + " ", results))
+                        for _ in range(processes)]
+            before = len(llm.requests)
+            started = time.perf_counter()
+            for child in children:
+                child.start()
+            answers = {results.get() for _ in children}
+            for child in children:
+                child.join()
+            print(f"{'parse across processes':<28} {processes:>8} {len(llm.requests) - before:>13} "
+                  f"{(time.perf_counter() - started) * 1000:>9.0f}  ({len(answers)} distinct answer)")
+
+    print(f"\nsingleflight stats (this process): {get_default_flight().stats()}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,83 @@
+"""Structured-data fast path: hit rate, answer recall and latency against an always-LLM baseline.
+
+Runs every query in ``benchmarks/fixtures/queries.json`` twice: straight to
+the stub LLM (which plays a perfect extractor and charges prefill time per
+prompt token), and through ``structured.answer_query`` first with the LLM
+as the fallback. Recall counts the expected facts present in the answer.
+
+Usage: python -m benchmarks.bench_structured [--ms-per-token 0.5]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ["GROQ_RPM"] = "0"
+os.environ["GROQ_TPM"] = "0"
+
+from llm_cache import get_response_cache  # noqa: E402
+from parse import parse_with_groq  # noqa: E402
+from scrape import clean_html  # noqa: E402
+from structured import answer_query, extract_structured, fast_path_stats  # noqa: E402
+from benchmarks.bench_retrieval import FIXTURES, extractor_for, recall  # noqa: E402
+from benchmarks.stub_servers import StubLLMServer  # noqa: E402
+
+
+def load_cases():
+    with open(os.path.join(FIXTURES, "queries.json"), "r", encoding="utf-8") as handle:
+        cases = json.load(handle)
+    pages = {}
+    for case in cases:
+        if case["page"] not in pages:
+            with open(os.path.join(FIXTURES, case["page"]), "r", encoding="utf-8") as handle:
+                pages[case["page"]] = handle.read()
+        case["html"] = pages[case["page"]]
+    return cases
+
+
+def ask_llm(html, query):
+    get_response_cache().clear()
+    return parse_with_groq(clean_html(html), query)
+
+
+def fast_path(html, query):
+    return answer_query(extract_structured(html), query) or ask_llm(html, query)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    answer = func(*args)
+    return answer, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ms-per-token", type=float, default=0.5, help="stub prefill cost per prompt token")
+    args = parser.parse_args(argv)
+
+    cases = load_cases()
+    with StubLLMServer(answer=extractor_for(cases), prompt_token_latency=args.ms_per_token / 1000) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        print(f"{'query':<58} {'path':>10} {'latency ms':>15} {'recall':>11}")
+        baseline, fast = [], []
+        for case in cases:
+            llm_answer, llm_time = timed(ask_llm, case["html"], case["query"])
+            hits_before = fast_path_stats()["hits"]
+            answer, seconds = timed(fast_path, case["html"], case["query"])
+            path = "structured" if fast_path_stats()["hits"] > hits_before else "llm"
+            baseline.append((llm_time, recall(llm_answer, case["expected"])))
+            fast.append((seconds, recall(answer, case["expected"])))
+            print(f"{case['query'][:58]:<58} {path:>10} {llm_time * 1000:>7.1f}->{seconds * 1000:<7.1f} "
+                  f"{baseline[-1][1]:>5.0%}->{fast[-1][1]:<5.0%}")
+
+    stats = fast_path_stats()
+    print(f"\nhit rate {stats['hit_rate']:.0%} ({stats['hits']}/{stats['queries']}, sources {stats['sources']}), "
+          f"median latency {statistics.median(t for t, _ in baseline) * 1000:.1f} -> "
+          f"{statistics.median(t for t, _ in fast) * 1000:.1f} ms, "
+          f"mean recall {statistics.mean(r for _, r in baseline):.0%} -> {statistics.mean(r for _, r in fast):.0%}")
+
+
+if __name__ == "__main__":
+    main()
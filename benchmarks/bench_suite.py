@@ -0,0 +1,201 @@
+"""Offline benchmark suite for every pipeline stage, compared with a stored baseline.
+
+Runs ``scrape_website`` (HTTP tier), the cleaning functions,
+``split_dom_content``, ``parse_with_groq`` and ``perse_with_Ollama`` on
+every page in ``benchmarks/fixtures`` (small article pages, a table-heavy
+report, an SPA shell) plus a generated multi-megabyte page. Pages come from
+a local stub HTTP server and answers from the stub LLM server, which speaks
+both the Groq chat-completions and the Ollama APIs, so nothing touches the
+network. Each case reports throughput, p50/p95 latency and the peak RSS
+growth of one call, and is compared with ``benchmarks/baseline.json``;
+the exit status is 1 when a case's p50 or peak RSS grew beyond the
+tolerance. Baselines are machine-specific: refresh it with
+``--save-baseline`` on the machine that runs the comparison.
+
+Browser rendering needs Chrome and is not covered; ``scrape_website`` runs
+with ``mode="http"``, so the SPA shell measures JS detection, not rendering.
+
+Usage: python -m benchmarks.bench_suite [--repeat 15] [--llm-latency 0.05] [--only clean]
+                                        [--save-baseline] [--tolerance 0.5]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# Stub endpoints, no account rate limits and no on-disk caches, so every call does the full work
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ["GROQ_RPM"] = "0"
+os.environ["GROQ_TPM"] = "0"
+os.environ["SCRAPER_CACHE_DIR"] = ""
+os.environ["LLM_CACHE_DIR"] = ""
+
+from llm_cache import get_response_cache  # noqa: E402
+from parse import parse_with_groq, perse_with_Ollama  # noqa: E402
+from scrape import clean_body_content, clean_html, extract_body_content, scrape_website, split_dom_content  # noqa: E402
+from benchmarks.bench_retrieval import FIXTURES  # noqa: E402
+from benchmarks.common import peak_rss_growth, percentile, synthetic_page  # noqa: E402
+from benchmarks.stub_servers import StubLLMServer, StubPageServer  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+HUGE_PAGE_BYTES = 2 * 1024 * 1024
+DEFAULT_QUERY = "List all items with their details"
+
+# Differences below these are noise on any machine, whatever the ratio. Peak RSS growth of a
+# forked child depends on how much freed heap it inherits, so it needs a wide margin.
+MIN_REGRESSION_MS = 0.5
+MIN_REGRESSION_RSS_MB = 16.0
+
+
+def load_corpus():
+    """{name: html} for every fixture page plus the generated huge page"""
+    corpus = {}
+    for name in sorted(os.listdir(FIXTURES)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as handle:
+                corpus[name] = handle.read()
+    corpus["huge.html"] = synthetic_page(HUGE_PAGE_BYTES)
+    return corpus
+
+
+def load_queries():
+    with open(os.path.join(FIXTURES, "queries.json"), "r", encoding="utf-8") as handle:
+        cases = json.load(handle)
+    queries = {}
+    for case in cases:
+        queries.setdefault(case["page"], case["query"])
+    return queries
+
+
+def uncached(parse):
+    """Parse call that always reaches the stub LLM"""
+    def call(text, query):
+        get_response_cache().clear()
+        return parse(text, query)
+    return call
+
+
+def build_cases(corpus, site):
+    """[(case name, page bytes, func, args)] in report order"""
+    queries = load_queries()
+    cases = []
+    for name, html in corpus.items():
+        text = clean_html(html)
+        body = extract_body_content(html)
+        query = queries.get(name, DEFAULT_QUERY)
+        size = len(html.encode("utf-8"))
+        cases.extend((f"{stage}/{name}", size, func, args) for stage, func, args in (
+            ("scrape_website", scrape_website, (site.url("/" + name), None, "http", False)),
+            ("clean_html", clean_html, (html,)),
+            ("clean_html_markdown", clean_html, (html, False, "markdown")),
+            ("clean_html_main", clean_html, (html, True)),
+            ("extract_body_content", extract_body_content, (html,)),
+            ("clean_body_content", clean_body_content, (body,)),
+            ("split_dom_content", split_dom_content, (text, 4000)),
+            ("parse_with_groq", uncached(parse_with_groq), (text, query)),
+            ("perse_with_Ollama", uncached(perse_with_Ollama), (text, query)),
+        ))
+    return cases
+
+
+def run_case(func, args, size, repeat):
+    func(*args)  # warm up connections, parsers and lazy imports
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call_started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    rss = peak_rss_growth(func, *args)
+    return {
+        "ops_per_s": round(repeat / elapsed, 2),
+        "mb_per_s": round(size * repeat / elapsed / 1e6, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "peak_rss_mb": None if rss is None else round(rss / 1e6, 2),
+    }
+
+
+def regressions(result, base, tolerance):
+    """Reasons ``result`` is worse than ``base`` beyond the tolerance and the noise floor"""
+    found = []
+    # p95 of a few dozen calls is too noisy to fail on; it is reported only
+    for key, floor in (("p50_ms", MIN_REGRESSION_MS), ("peak_rss_mb", MIN_REGRESSION_RSS_MB)):
+        new, old = result.get(key), base.get(key)
+        if new is None or old is None:
+            continue
+        if new > old * (1 + tolerance) and new - old > floor:
+            found.append(f"{key} {old:g} -> {new:g}")
+    return found
+
+
+def change(result, base):
+    if not base or not base.get("p50_ms"):
+        return "new"
+    return f"{result['p50_ms'] / base['p50_ms'] - 1:+.0%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=15, help="timed calls per case")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    parser.add_argument("--only", default="", help="run cases whose name contains this text")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown/growth before failing")
+    args = parser.parse_args()
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            stored = json.load(handle)["results"]
+    baseline = {} if args.save_baseline else stored
+
+    corpus = load_corpus()
+    results, failed = {}, []
+    print(f"{'case':<42} {'ops/s':>8} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'RSS MB':>7} {'vs base':>8}")
+    with StubPageServer({"/" + name: html for name, html in corpus.items()}) as site, \
+            StubLLMServer(latency=args.llm_latency) as llm:
+        os.environ["GROQ_BASE_URL"] = llm.base_url
+        os.environ["OLLAMA_HOST"] = llm.ollama_url
+        for name, size, func, func_args in build_cases(corpus, site):
+            if args.only not in name:
+                continue
+            result = run_case(func, func_args, size, args.repeat)
+            base = baseline.get(name)
+            if base and regressions(result, base, args.tolerance):
+                # Measure once more so a burst of background load does not fail the run
+                retry = run_case(func, func_args, size, args.repeat)
+                result = min(result, retry, key=lambda run: run["p50_ms"])
+            results[name] = result
+            rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.1f}"
+            print(f"{name:<42} {result['ops_per_s']:>8.1f} {result['mb_per_s']:>8.2f} {result['p50_ms']:>9.2f} "
+                  f"{result['p95_ms']:>9.2f} {rss:>7} {change(result, base):>8}")
+            if base:
+                failed.extend(f"{name}: {reason}" for reason in regressions(result, base, args.tolerance))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump({
+                "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                                "repeat": args.repeat, "llm_latency": args.llm_latency},
+                "results": dict(stored, **results),  # --only refreshes just the cases it ran
+            }, handle, indent=1, sort_keys=True)
+            handle.write("\n")
+        print(f"\nsaved {len(results)} results to {args.baseline}")
+    elif not baseline:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to create one")
+    elif failed:
+        print(f"\n{len(failed)} regression(s) over {args.tolerance:.0%}:")
+        for line in failed:
+            print("  " + line)
+        sys.exit(1)
+    else:
+        print(f"\nOK: no case regressed more than {args.tolerance:.0%} against the baseline")
+
+
+if __name__ == "__main__":
+    main()
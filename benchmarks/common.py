@@ -0,0 +1,94 @@
+"""Shared helpers for the benchmark scripts (run them with ``python -m benchmarks.<name>``)."""
+import multiprocessing
+import random
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_WORDS = (
+    "project python scraper selenium table product price review data model "
+    "server client browser content section article footer header menu"
+).split()
+
+
+def synthetic_page(target_bytes, seed=0):
+    """Realistic-looking HTML page of roughly ``target_bytes`` bytes"""
+    rng = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html><html><head><title>Benchmark</title>",
+        "<style>body{font-family:sans-serif}.x{color:red}</style>",
+        "<script>window.dataLayer=[];function t(){return 1}</script></head><body>",
+        "<nav><ul>" + "".join(f"<li><a href='/p{i}'>Link {i}</a></li>" for i in range(20)) + "</ul></nav>",
+    ]
+    size = sum(len(p) for p in parts)
+    block = 0
+    while size < target_bytes:
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 60)))
+        if block % 5 == 4:
+            rows = "".join(
+                f"<tr><td>{rng.choice(_WORDS)}</td><td>{rng.randint(1, 999)}</td></tr>" for _ in range(8)
+            )
+            piece = f"<table><tr><th>Name</th><th>Value</th></tr>{rows}</table>"
+        elif block % 7 == 6:
+            piece = f"<form><input name='q'><button>Go</button></form><svg><path d='M0 0L{block} {block}'/></svg>"
+        else:
+            piece = f"<section><h2>Section {block}</h2><p>{words}</p><p><b>{words[:40]}</b>  {words[40:]}</p></section>"
+        parts.append(piece)
+        size += len(piece)
+        block += 1
+    parts.append("<footer>&copy; Benchmark Inc.</footer><script>t()</script></body></html>")
+    return "".join(parts)
+
+
+def measure(func, *args, repeat=3):
+    """Best wall time over ``repeat`` runs and the peak traced allocation of one run"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _rss_child(func, args, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func(*args)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((after - before) * 1024)  # ru_maxrss is in KiB on Linux
+
+
+def peak_rss_growth(func, *args):
+    """Growth of the peak RSS (bytes) while running ``func`` once in a forked child.
+
+    Unlike tracemalloc this includes memory allocated by C libraries such as
+    libxml2. Returns None where fork or ``resource`` are unavailable.
+    """
+    if resource is None or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_rss_child, args=(func, args, queue))
+    process.start()
+    growth = queue.get()
+    process.join()
+    return growth
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
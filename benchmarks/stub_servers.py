@@ -0,0 +1,221 @@
+"""Local stand-ins for the network services the app talks to.
+
+``StubLLMServer`` speaks the Groq/OpenAI chat-completions API with a
+configurable latency and can inject 429/5xx failures, so clients can be
+exercised without network access or an API key. Requests with
+``"stream": true`` are answered word by word as server-sent events. The
+same server answers Ollama's ``/api/generate`` and ``/api/chat`` (streamed
+as newline-delimited JSON unless ``"stream": false``), so pointing
+OLLAMA_HOST at ``ollama_url`` exercises the langchain-ollama backend too.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _LLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, answer, token_delay):
+        """Server-sent events, one word per chunk, terminated by ``data: [DONE]``"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")  # as the real API does
+        self.end_headers()
+
+        def send(data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        for word in re.findall(r"\S+\s*|\s+", answer):
+            event = {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": word}}]}
+            send(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            time.sleep(token_delay)
+        send(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_ollama(self, payload, answer, token_delay):
+        """Ollama's reply: one JSON object, or one line per word ending with a ``done`` summary"""
+        chat = self.path == "/api/chat"
+
+        def part(text, done):
+            body = {"model": payload.get("model"), "created_at": "2025-01-01T00:00:00Z", "done": done}
+            if chat:
+                body["message"] = {"role": "assistant", "content": text}
+            else:
+                body["response"] = text
+            if done:
+                body.update(done_reason="stop", prompt_eval_count=len(_ollama_prompt(payload)) // 4,
+                            eval_count=len(answer) // 4)
+            return body
+
+        if not payload.get("stream", True):
+            self._send_json(200, part(answer, True))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for body in [part(word, False) for word in re.findall(r"\S+\s*|\s+", answer)] + [part("", True)]:
+            data = json.dumps(body).encode("utf-8") + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+            time.sleep(token_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        stub.record(payload)
+
+        failure = stub.next_failure()
+        if failure:
+            status, retry_after = failure
+            headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+            self._send_json(status, {"error": {"message": "stubbed failure"}}, headers)
+            return
+
+        # Prefill time grows with the prompt, as it does on a real model server
+        ollama = self.path in ("/api/generate", "/api/chat")
+        prompt = _ollama_prompt(payload) if ollama else "".join(
+            message.get("content", "") for message in payload.get("messages", []))
+        time.sleep(stub.latency + len(prompt) / 4 * stub.prompt_token_latency)
+        if ollama:
+            self._send_ollama(payload, stub.answer(prompt), stub.token_delay)
+        elif self.path.endswith("/chat/completions") and payload.get("stream"):
+            self._send_stream(stub.answer(payload["messages"][-1]["content"]), stub.token_delay)
+        elif self.path.endswith("/chat/completions"):
+            prompt = payload["messages"][-1]["content"]
+            answer = stub.answer(prompt)
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(answer) // 4,
+                          "total_tokens": (len(prompt) + len(answer)) // 4},
+            })
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+
+def _ollama_prompt(payload):
+    if "prompt" in payload:
+        return payload["prompt"]
+    return "".join(message.get("content", "") for message in payload.get("messages", []))
+
+
+def default_answer(prompt):
+    """Echo the first content line so answers differ per chunk"""
+    content = prompt.split("Content: ", 1)[-1]
+    first_line = next((line for line in content.splitlines() if line.strip()), "")
+    return f"| Item | Source |\n|---|---|\n| {first_line[:60]} | stub |"
+
+
+class StubLLMServer:
+    """Threaded chat-completions stub; use as a context manager"""
+
+    def __init__(self, latency=0.0, failures=None, answer=default_answer, port=0, token_delay=0.0,
+                 prompt_token_latency=0.0):
+        self.latency = latency
+        self.prompt_token_latency = prompt_token_latency
+        self.token_delay = token_delay
+        self.answer = answer
+        self._failures = list(failures or [])  # [(status, retry_after), ...] served first
+        self._lock = threading.Lock()
+        self.requests = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _LLMHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/openai/v1"
+
+    @property
+    def ollama_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, payload):
+        with self._lock:
+            self.requests.append(payload)
+
+    def next_failure(self):
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stub = self.server.stub
+        with stub._lock:
+            stub.requests += 1
+        time.sleep(stub.latency)
+        html = stub.pages.get(self.path.split("?", 1)[0])
+        status, body = (200, html.encode("utf-8")) if html is not None else (404, b"not found")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubPageServer:
+    """Serves ``pages`` ({path: html}) over HTTP with a fixed per-request latency"""
+
+    def __init__(self, pages, latency=0.0, port=0):
+        self.pages = pages
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _PageHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
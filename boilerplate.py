@@ -0,0 +1,104 @@
+"""Main-content detection: remove navigation, banners, footers and sidebars from a parsed page."""
+import re
+
+# Blocks that may be dropped as a whole; inline elements and tables never are
+BLOCK_TAGS = frozenset((
+    "div", "section", "ul", "ol", "dl", "menu", "nav", "aside", "footer", "header", "form", "details",
+))
+BOILERPLATE_TAGS = frozenset(("nav", "aside", "footer"))
+# Lists inside <main>/<article> are content (skills, specs), however short their items
+LIST_TAGS = frozenset(("ul", "ol", "dl"))
+BOILERPLATE_ROLES = frozenset(("navigation", "banner", "contentinfo", "complementary", "search", "dialog"))
+
+_NEGATIVE_HINT = re.compile(
+    r"cookie|consent|gdpr|banner|breadcrumb|newsletter|subscribe|signup|social|share|sharing|"
+    r"related|recommend|trending|promo|advert|\bads?\b|sponsor|sidebar|widget|menu|navbar|"
+    r"footer|masthead|legal|copyright|popup|modal|recently",
+    re.IGNORECASE,
+)
+_POSITIVE_HINT = re.compile(r"\b(?:article|content|entry|main|post|story|product|body)\b", re.IGNORECASE)
+
+# A block is a link list when this share of its text sits inside <a>
+MAX_LINK_DENSITY = 0.5
+# ... or a menu when it has links and this many text nodes averaging fewer characters than this
+MIN_MENU_NODES = 6
+MAX_MENU_NODE_CHARS = 14
+# <main>/<article> must hold this share of the page's text to be trusted
+MIN_MAIN_SHARE = 0.3
+
+
+def _text_stats(root):
+    """{element: [chars, link_chars, text_nodes]} for every element, in one post-order pass"""
+    stats = {}
+    # Reversed document order visits every descendant before its ancestors
+    for element in reversed(list(root.iter())):
+        if not isinstance(element.tag, str):
+            continue
+        own = len((element.text or "").strip())
+        chars, link_chars, nodes = own, 0, 1 if own else 0
+        for child in element:
+            child_stats = stats.get(child)
+            tail = len((child.tail or "").strip())
+            chars += tail
+            nodes += 1 if tail else 0
+            if child_stats:
+                chars += child_stats[0]
+                link_chars += child_stats[1]
+                nodes += child_stats[2]
+        if element.tag == "a":
+            link_chars = chars
+        stats[element] = [chars, link_chars, nodes]
+    return stats
+
+
+def _hints(element):
+    return " ".join((element.get("class") or "", element.get("id") or ""))
+
+
+def is_boilerplate(element, stats, in_main=False):
+    """True when a block element looks like navigation, chrome or legal filler"""
+    if element.tag not in BLOCK_TAGS:
+        return False
+    chars, link_chars, nodes = stats.get(element, (0, 0, 0))
+    if element.tag in BOILERPLATE_TAGS or (element.get("role") or "").lower() in BOILERPLATE_ROLES:
+        return True
+    if element.tag == "header":
+        # Page headers are logo + menu; article headers carry the headline
+        return element.find(".//h1") is None and element.find(".//h2") is None
+    hints = _hints(element)
+    if hints.strip() and _NEGATIVE_HINT.search(hints) and not _POSITIVE_HINT.search(hints):
+        return True
+    if chars and link_chars / chars > MAX_LINK_DENSITY:
+        return True
+    if in_main and element.tag in LIST_TAGS:
+        return False
+    if link_chars and element.find(".//table") is None and nodes >= MIN_MENU_NODES \
+            and chars / nodes < MAX_MENU_NODE_CHARS:
+        return True
+    return False
+
+
+def _main_root(body, stats):
+    total = stats.get(body, (0,))[0] or 1
+    for path in (".//main", ".//*[@role='main']", ".//article"):
+        candidates = body.findall(path)
+        if len(candidates) == 1 and stats.get(candidates[0], (0,))[0] / total >= MIN_MAIN_SHARE:
+            return candidates[0]
+    return body
+
+
+def extract_main(body):
+    """Element holding the page's main content, with boilerplate blocks removed in place"""
+    stats = _text_stats(body)
+    root = _main_root(body, stats)
+    in_main = root is not body
+    stack = [root]
+    while stack:
+        for child in list(stack.pop()):
+            if not isinstance(child.tag, str):
+                continue
+            if is_boilerplate(child, stats, in_main):
+                child.drop_tree()  # keeps the tail text, which belongs to the parent
+            else:
+                stack.append(child)
+    return root
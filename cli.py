@@ -0,0 +1,270 @@
+"""Headless batch entry point: scrape and parse a list of URLs into JSON Lines (the output is also the checkpoint).
+
+    python cli.py urls.txt -o results.jsonl --query "List all products with prices"
+"""
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import crawler
+from dedup import Deduplicator
+from parse import BACKENDS, parse_chunks
+from scrape import clean_html, scrape_many, scrape_website
+from structured import answer_query, extract_structured, fast_path_stats
+from url_utils import normalize_url
+
+# fsync the output after this many records (and always at the end)
+FSYNC_EVERY = 20
+
+
+def read_jobs(handle, default_query):
+    """Parse input lines into (url, query) pairs, skipping blanks and comments"""
+    jobs = []
+    for line in handle:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            record = json.loads(line)
+            jobs.append((record["url"], record.get("query") or default_query))
+        elif "\t" in line:
+            url, query = line.split("\t", 1)
+            jobs.append((url.strip(), query.strip() or default_query))
+        else:
+            jobs.append((line, default_query))
+    return jobs
+
+
+def load_checkpoint(path):
+    """(url, query) pairs already completed successfully in a previous run"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if record.get("status") == "ok":
+                done.add((record["url"], record.get("query") or ""))
+    return done
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+
+def run(jobs, output_path, concurrency=4, per_host=2, parse_workers=4, chunk_size=None,
+        backend="groq", model=None, mode="auto", include_content=False, retrieve=False, top_k=None,
+        main_content=False, output="text", structured=True, crawl=False, max_pages=crawler.CRAWL_MAX_PAGES,
+        max_depth=crawler.CRAWL_MAX_DEPTH, crawl_delay=crawler.CRAWL_DELAY, include=None, dedup=False):
+    done = load_checkpoint(output_path)
+    if crawl:
+        # A finished seed says nothing about the pages behind it: crawl again, skip finished pages below
+        pending = list(dict.fromkeys(jobs))
+    else:
+        pending = [job for job in dict.fromkeys(jobs) if (job[0], job[1] or "") not in done]
+    skipped = len(jobs) - len(pending)
+
+    queries_by_url = {}
+    for url, query in pending:
+        # Crawl results name their seed in normalized form
+        queries_by_url.setdefault(normalize_url(url) if crawl else url, []).append(query)
+
+    deduplicator = Deduplicator() if dedup else None
+    latencies = []
+    counts = {"ok": 0, "error": 0, "empty": 0}
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out_file, \
+            ThreadPoolExecutor(max_workers=parse_workers) as parse_pool:
+        written = 0
+
+        def write(record):
+            nonlocal written
+            out_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out_file.flush()
+            written += 1
+            if written % FSYNC_EVERY == 0:
+                os.fsync(out_file.fileno())
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            latencies.append(record["elapsed"])
+
+        def parse_job(page, query):
+            parse_started = time.perf_counter()
+            answer = None
+            if structured:
+                # Read JSON-LD, microdata and tables from the raw page once, in a parse worker
+                if "structured" not in page:
+                    page["structured"] = extract_structured(page["html"])
+                answer = answer_query(page["structured"], query)
+            if answer:
+                return {"status": "ok", "result": answer, "chunks": 0, "prompt_tokens": 0, "error": None,
+                        "answered_by": "structured", "parse_time": round(time.perf_counter() - parse_started, 3)}
+            job = parse_chunks(page["content"], query, chunk_size=chunk_size, backend=backend, model=model,
+                               retrieve=retrieve, top_k=top_k)
+            failed = job["failed"] and job["failed"] == job["chunks"]
+            return {
+                "status": "error" if failed else "ok",
+                "result": job["result"],
+                "chunks": job["chunks"],
+                "prompt_tokens": job["prompt_tokens"],
+                "error": job["result"] if failed else None,
+                "answered_by": "llm",
+                "parse_time": round(time.perf_counter() - parse_started, 3),
+            }
+
+        parse_futures = {}
+
+        def finish(future):
+            record = parse_futures.pop(future)
+            try:
+                record.update(future.result())
+            except Exception as e:
+                record.update({"status": "error", "error": str(e)})
+            record["elapsed"] = round(record["elapsed"] + record["parse_time"], 3)
+            record["finished_at"] = time.time()
+            write(record)
+
+        fetch = functools.partial(scrape_website, mode=mode)
+        clean = functools.partial(clean_html, main_content=main_content, output=output)
+        if crawl:
+            pages = crawler.crawl(
+                list(queries_by_url), max_pages=max_pages, max_depth=max_depth, max_concurrency=concurrency,
+                per_host_limit=per_host, delay=crawl_delay, url_filter=re.compile(include).search if include else None,
+                fetch=fetch, clean=clean,
+            )
+        else:
+            pages = scrape_many(list(queries_by_url), max_concurrency=concurrency, per_host_limit=per_host,
+                                fetch=fetch, clean=clean)
+        # Parsing of finished pages overlaps with fetching of the rest
+        for page in pages:
+            if deduplicator is not None and page["status"] == "ok":
+                page["content"] = deduplicator.dedup(page["content"], page["url"])
+            for query in queries_by_url[page.get("seed", page["url"])]:
+                if crawl and (page["url"], query or "") in done:
+                    skipped += 1
+                    continue
+                record = {
+                    "url": page["url"], "query": query, "status": page["status"], "result": None,
+                    "chunks": 0, "fetch_time": page["fetch_time"], "parse_time": 0.0,
+                    "elapsed": page["elapsed"], "error": page["error"], "answered_by": None,
+                }
+                if crawl:
+                    record.update(seed=page["seed"], depth=page["depth"])
+                if include_content:
+                    record["content"] = page["content"]
+                if page["status"] == "ok" and query:
+                    parse_futures[parse_pool.submit(parse_job, page, query)] = record
+                else:
+                    if page["status"] == "empty":
+                        record["error"] = "empty page"
+                    record["finished_at"] = time.time()
+                    write(record)
+
+            # Checkpoint parses that finished meanwhile, so a crash loses as little as possible
+            for future in [future for future in parse_futures if future.done()]:
+                finish(future)
+
+        for future in as_completed(list(parse_futures)):
+            finish(future)
+
+        out_file.flush()
+        os.fsync(out_file.fileno())
+
+    elapsed = time.perf_counter() - started
+    return {
+        "jobs": len(jobs),
+        "skipped": skipped,
+        "processed": len(latencies),
+        "counts": counts,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "structured": fast_path_stats(),
+        "dedup": deduplicator.stats() if deduplicator is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-scrape URLs and parse them with an LLM into JSON Lines")
+    parser.add_argument("input", nargs="?", default="-", help="file with one URL per line, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="JSON Lines output; also used to resume")
+    parser.add_argument("-q", "--query", default="", help="default parse description for URLs without one")
+    parser.add_argument("--concurrency", type=int, default=4, help="pages fetched in parallel")
+    parser.add_argument("--per-host", type=int, default=2, help="parallel fetches per host")
+    parser.add_argument("--parse-workers", type=int, default=4, help="pages parsed in parallel")
+    parser.add_argument("--chunk-size", type=int, help="characters per chunk (default: fit the model's context)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="groq")
+    parser.add_argument("--model", help="model name for the backend (default: the backend's default model)")
+    parser.add_argument("--main-content", action="store_true", help="drop navigation, footers and sidebars")
+    parser.add_argument("--format", choices=("text", "markdown"), default="text",
+                        help="page text sent to the model; markdown keeps headings, lists and table rows")
+    parser.add_argument("--no-structured", dest="structured", action="store_false",
+                        help="always ask the LLM, even when JSON-LD, microdata or a table answers the query")
+    parser.add_argument("--dedup", action="store_true",
+                        help="drop lines already sent for an earlier page of this run (menus, footers, notices)")
+    parser.add_argument("--retrieve", action="store_true", help="send only the passages relevant to the query")
+    parser.add_argument("--top-k", type=int, help="with --retrieve, at most this many matching passages")
+    parser.add_argument("--mode", choices=("auto", "http", "browser"), default="auto")
+    parser.add_argument("--include-content", action="store_true", help="store the cleaned page text too")
+    parser.add_argument("--crawl", action="store_true", help="treat URLs as seeds and follow links within their site")
+    parser.add_argument("--max-pages", type=int, default=crawler.CRAWL_MAX_PAGES, help="with --crawl, pages fetched")
+    parser.add_argument("--max-depth", type=int, default=crawler.CRAWL_MAX_DEPTH,
+                        help="with --crawl, links followed from a seed (pagination does not count)")
+    parser.add_argument("--crawl-delay", type=float, default=crawler.CRAWL_DELAY,
+                        help="with --crawl, seconds between requests to one host (robots.txt may ask for more)")
+    parser.add_argument("--include", help="with --crawl, only follow links matching this regular expression")
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        jobs = read_jobs(sys.stdin, args.query)
+    else:
+        with open(args.input, "r", encoding="utf-8") as handle:
+            jobs = read_jobs(handle, args.query)
+
+    summary = run(
+        jobs, args.output, concurrency=args.concurrency, per_host=args.per_host,
+        parse_workers=args.parse_workers, chunk_size=args.chunk_size, backend=args.backend,
+        model=args.model, mode=args.mode, include_content=args.include_content,
+        retrieve=args.retrieve, top_k=args.top_k, main_content=args.main_content,
+        output=args.format, structured=args.structured, crawl=args.crawl, max_pages=args.max_pages,
+        max_depth=args.max_depth, crawl_delay=args.crawl_delay, include=args.include, dedup=args.dedup,
+    )
+
+    scope = f"pages crawled from {summary['jobs']} seeds" if args.crawl else f"of {summary['jobs']} jobs"
+    print(
+        f"Processed {summary['processed']} {scope} "
+        f"({summary['skipped']} already done) in {summary['elapsed']:.1f}s, "
+        f"{summary['throughput']:.2f} jobs/s",
+        file=sys.stderr,
+    )
+    print(f"Status: {summary['counts']}", file=sys.stderr)
+    print(
+        f"Latency p50 {summary['p50']:.2f}s  p90 {summary['p90']:.2f}s  p99 {summary['p99']:.2f}s",
+        file=sys.stderr,
+    )
+    if args.structured:
+        fast = summary["structured"]
+        print(f"Structured data answered {fast['hits']} of {fast['queries']} queries "
+              f"({fast['hit_rate']:.0%}) without the LLM", file=sys.stderr)
+    if summary["dedup"]:
+        dedup = summary["dedup"]
+        print(f"Dedup dropped {dedup['dropped']} of {dedup['lines']} lines, {dedup['chars_saved']} characters "
+              f"and ~{dedup['tokens_saved']} tokens", file=sys.stderr)
+    return 0 if not summary["counts"].get("error") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
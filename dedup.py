@@ -0,0 +1,204 @@
+"""Drop lines a job has already seen (shared headers, footers, templated blocks) before LLM calls."""
+import itertools
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+import metrics
+from tokens import estimate_tokens
+
+# Fingerprints remembered per kind (lines, runs, sketches); the oldest are forgotten first
+DEDUP_MAX_FINGERPRINTS = int(os.getenv("DEDUP_MAX_FINGERPRINTS", "100000"))
+
+# Lines this long are dropped on an exact repeat; shorter ones (prices, cells) only within a repeated run
+MIN_LINE_CHARS = 40
+RUN_LINES = 3
+# Lines with this many words are also dropped when a MinHash estimate puts them this close to one seen before
+NEAR_MIN_WORDS = 12
+NEAR_MIN_SIMILARITY = 0.8
+# Bottom-k MinHash: the k smallest bigram hashes of a line; its two smallest index it for lookup.
+# One changed word in a 30-word line keeps ~0.9 similarity, two different lines of a page ~0.
+SKETCH_SIZE = 16
+_ANCHORS = 2
+# Candidates compared per anchor, newest first, so a very common bigram cannot make lookups slow
+_MAX_CANDIDATES = 16
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def sketch(words):
+    """Bottom-k MinHash sketch of the word bigrams, packed as 32-bit integers"""
+    features = {f"{first} {second}" for first, second in zip(words, words[1:])} or set(words)
+    # str hashes are salted per process, which is fine: fingerprints never leave the process
+    hashes = sorted(hash(feature) & 0xFFFFFFFF for feature in features)[:SKETCH_SIZE]
+    return struct.pack(f"<{len(hashes)}I", *hashes)
+
+
+def _unpack(value):
+    return struct.unpack(f"<{len(value) // 4}I", value)
+
+
+def similarity(first, second):
+    """Jaccard similarity estimated from two sketches (packed, or already unpacked to sets)"""
+    first = first if isinstance(first, set) else set(_unpack(first))
+    second = second if isinstance(second, set) else set(_unpack(second))
+    shared = len(first & second)
+    # Matches among the k smallest of the union can be no more than the values shared at all
+    if shared < NEAR_MIN_SIMILARITY * min(SKETCH_SIZE, len(first) + len(second) - shared):
+        return shared / (len(first) + len(second) - shared)
+    union = sorted(first | second)[:SKETCH_SIZE]
+    return sum(1 for value in union if value in first and value in second) / len(union)
+
+
+class _LRU:
+    """Bounded fingerprint -> source map; returns the evicted key, if any"""
+
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self.items = OrderedDict()
+
+    def get(self, key):
+        source = self.items.get(key)
+        if source is not None:
+            self.items.move_to_end(key)
+        return source
+
+    def put(self, key, source):
+        self.items[key] = source
+        self.items.move_to_end(key)
+        if len(self.items) > self.capacity:
+            return self.items.popitem(last=False)[0]
+        return None
+
+    def __len__(self):
+        return len(self.items)
+
+
+class Deduplicator:
+    """Per-session memory of seen lines; pass the page URL as ``source`` so a page never loses its own lines"""
+
+    def __init__(self, max_fingerprints=DEDUP_MAX_FINGERPRINTS):
+        self._lock = threading.Lock()
+        self._lines = _LRU(max_fingerprints)
+        self._runs = _LRU(max_fingerprints)
+        self._sketches = _LRU(max_fingerprints)
+        self._anchors = {}  # smallest bigram hash -> {sketch: None}, oldest first
+        self._anonymous = 0
+        self._stats = {"documents": 0, "lines": 0, "exact": 0, "near": 0, "runs": 0,
+                       "chars_in": 0, "chars_saved": 0, "tokens_in": 0, "tokens_saved": 0}
+
+    def _seen(self, store, key, source, fresh):
+        """Whether ``key`` counts as a repeat for ``source``; records it otherwise"""
+        owner = store.get(key)
+        if owner is not None and (owner != source or key in fresh):
+            return True
+        fresh.add(key)
+        if owner is None:
+            evicted = store.put(key, source)
+            if evicted is not None and store is self._sketches:
+                self._unanchor(evicted)
+        return False
+
+    def _anchor_keys(self, value):
+        return _unpack(value)[:_ANCHORS]
+
+    def _unanchor(self, value):
+        for key in self._anchor_keys(value):
+            bucket = self._anchors.get(key)
+            if bucket is not None:
+                bucket.pop(value, None)
+                if not bucket:
+                    del self._anchors[key]
+
+    def _near_repeat(self, value, source, fresh):
+        values = set(_unpack(value))
+        for key in self._anchor_keys(value):
+            bucket = self._anchors.get(key, {})
+            for other in itertools.islice(reversed(bucket), _MAX_CANDIDATES):
+                if other != value and similarity(values, other) >= NEAR_MIN_SIMILARITY:
+                    owner = self._sketches.get(other)
+                    if owner is not None and (owner != source or other in fresh):
+                        return True
+        if self._seen(self._sketches, value, source, fresh):
+            return True
+        for key in self._anchor_keys(value):
+            self._anchors.setdefault(key, {})[value] = None
+        return False
+
+    def dedup(self, text, source=None):
+        """``text`` without lines already seen in this page or earlier pages of the session"""
+        if not text:
+            return text
+        lines = text.split("\n")
+        keys = [hash(_WHITESPACE.sub(" ", line).strip().lower()) for line in lines]
+        runs = [hash(tuple(keys[i:i + RUN_LINES])) for i in range(len(keys) - RUN_LINES + 1)]
+
+        with self._lock:
+            if source is None:
+                self._anonymous += 1
+                source = ("anonymous", self._anonymous)
+            # Fingerprints first recorded by this call, per store: repeats of these are within the page
+            fresh = {store: set() for store in (self._lines, self._runs, self._sketches)}
+            # A line inside any repeated run of RUN_LINES lines is a repeat itself
+            in_repeated_run = [False] * len(lines)
+            for start, run in enumerate(runs):
+                if self._seen(self._runs, run, source, fresh[self._runs]):
+                    for index in range(start, start + RUN_LINES):
+                        in_repeated_run[index] = True
+
+            kept = []
+            counts = {"exact": 0, "near": 0, "runs": 0}
+            for line, key, repeated in zip(lines, keys, in_repeated_run):
+                stripped = line.strip()
+                if not stripped:
+                    kept.append(line)
+                    continue
+                if len(stripped) >= MIN_LINE_CHARS:
+                    if self._seen(self._lines, key, source, fresh[self._lines]):
+                        counts["exact"] += 1
+                        continue
+                    words = _WORD.findall(stripped.lower())
+                    if len(words) >= NEAR_MIN_WORDS and \
+                            self._near_repeat(sketch(words), source, fresh[self._sketches]):
+                        counts["near"] += 1
+                        continue
+                elif repeated:
+                    counts["runs"] += 1
+                    continue
+                kept.append(line)
+
+            result = "\n".join(kept)
+            tokens_in = estimate_tokens(text)
+            tokens_saved = tokens_in - estimate_tokens(result) if len(kept) < len(lines) else 0
+            stats = self._stats
+            stats["documents"] += 1
+            stats["lines"] += len(lines)
+            for kind, count in counts.items():
+                stats[kind] += count
+            stats["chars_in"] += len(text)
+            stats["chars_saved"] += len(text) - len(result)
+            stats["tokens_in"] += tokens_in
+            stats["tokens_saved"] += tokens_saved
+
+        for kind, count in counts.items():
+            metrics.inc("dedup_lines_total", count, result=kind)
+        metrics.inc("dedup_lines_total", len(kept), result="kept")
+        metrics.inc("dedup_saved_chars_total", len(text) - len(result))
+        metrics.inc("dedup_saved_tokens_total", tokens_saved)
+        return result
+
+    def stats(self):
+        """Lines dropped by kind, characters and tokens in and saved, and fingerprints held"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["dropped"] = stats["exact"] + stats["near"] + stats["runs"]
+            stats["fingerprints"] = len(self._lines) + len(self._runs) + len(self._sketches)
+        return stats
+
+
+def dedup_text(text):
+    """``text`` without lines repeated within it (no session memory)"""
+    return Deduplicator().dedup(text)
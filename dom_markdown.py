@@ -0,0 +1,140 @@
+"""Render a cleaned lxml tree as compact Markdown (headings, lists, one table row per line) in one walk."""
+import re
+
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+BLOCK_TAGS = frozenset((
+    "p", "div", "section", "article", "main", "header", "footer", "nav", "aside", "blockquote",
+    "pre", "figure", "figcaption", "address", "dl", "dt", "dd", "hr", "form", "fieldset", "details",
+    "summary", "body", "caption",
+))
+LIST_TAGS = frozenset(("ul", "ol", "menu"))
+# Elements that separate words when they appear inside a table cell
+_CELL_BREAKS = frozenset(("br", "li", "table", "tr", "td", "th"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _MarkdownWriter:
+    """Collects output lines while the tree is walked"""
+
+    def __init__(self):
+        self.lines = []
+        self.inline = []
+        self.lists = []           # [ordered, next number] per open list
+        self.prefix = None        # marker of a list item whose first line is pending
+        self.table_depth = 0
+        self.rows = None
+        self.row = None
+        self.cell = None
+
+    def text(self, value):
+        if value:
+            (self.cell if self.cell is not None else self.inline).append(value)
+
+    def flush(self, prefix=""):
+        line = _WHITESPACE.sub(" ", "".join(self.inline)).strip()
+        self.inline = []
+        if not line:
+            return
+        if self.prefix is not None:
+            prefix, self.prefix = self.prefix, None
+        elif self.lists:
+            prefix = "  " * len(self.lists) + prefix
+        self.lines.append(prefix + line)
+
+    def start(self, element):
+        tag = element.tag
+        if self.table_depth:
+            # Inside a table only rows and cells matter; nested tables flow into the cell
+            if tag == "table":
+                self.table_depth += 1
+            if self.table_depth == 1 and tag == "tr":
+                self.row = []
+            elif self.table_depth == 1 and tag in ("td", "th"):
+                self.cell = []
+            elif self.cell is not None and (tag in BLOCK_TAGS or tag in _CELL_BREAKS):
+                self.cell.append(" ")
+            return
+
+        if tag == "table":
+            self.flush()
+            self.table_depth, self.rows = 1, []
+        elif tag in LIST_TAGS:
+            self.flush()
+            self.lists.append([tag == "ol", 1])
+        elif tag == "li":
+            self.flush()
+            indent = "  " * (len(self.lists) - 1)
+            if self.lists and self.lists[-1][0]:
+                self.prefix = f"{indent}{self.lists[-1][1]}. "
+                self.lists[-1][1] += 1
+            else:
+                self.prefix = indent + "- "
+        elif tag in HEADING_LEVELS or tag in BLOCK_TAGS or tag == "br":
+            self.flush()
+
+    def end(self, element):
+        tag = element.tag
+        if self.table_depth:
+            if tag == "table":
+                self.table_depth -= 1
+                if not self.table_depth:
+                    self._write_table()
+            elif self.table_depth == 1 and tag in ("td", "th") and self.cell is not None:
+                cell = _WHITESPACE.sub(" ", "".join(self.cell)).strip().replace("|", "\\|")
+                self.row.append(cell)
+                self.cell = None
+            elif self.table_depth == 1 and tag == "tr" and self.row is not None:
+                if any(self.row):
+                    self.rows.append(self.row)
+                self.row = None
+            return
+
+        if tag in HEADING_LEVELS:
+            self.flush("#" * HEADING_LEVELS[tag] + " ")
+        elif tag in LIST_TAGS:
+            self.flush()
+            if self.lists:
+                self.lists.pop()
+        elif tag == "li" or tag in BLOCK_TAGS:
+            self.flush()
+
+    def _write_table(self):
+        rows, self.rows = self.rows, None
+        if not rows:
+            return
+        width = max(len(row) for row in rows)
+        if width == 1:
+            # A one-column "table" is just a list of lines
+            self.lines.extend(row[0] for row in rows if row[0])
+            return
+        # GFM rows without the optional outer pipes, and the shortest delimiter row
+        for index, row in enumerate(rows):
+            self.lines.append(" | ".join(row + [""] * (width - len(row))))
+            if index == 0:
+                self.lines.append("|".join("-" * width))
+
+    def result(self):
+        self.flush()
+        return "\n".join(self.lines)
+
+
+def render_markdown(root):
+    """Markdown for ``root`` and its subtree (comments are skipped, their tail text kept)"""
+    writer = _MarkdownWriter()
+    stack = [(root, False)]
+    while stack:
+        element, closing = stack.pop()
+        if closing:
+            writer.end(element)
+            if element is not root:
+                writer.text(element.tail)
+            continue
+        if not isinstance(element.tag, str):
+            writer.text(element.tail)
+            continue
+        writer.start(element)
+        writer.text(element.text)
+        stack.append((element, True))
+        stack.extend((child, False) for child in reversed(element))
+    return writer.result()
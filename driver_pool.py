@@ -0,0 +1,212 @@
+import atexit
+import os
+import queue
+import shutil
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+# Pool tuning (override with environment variables)
+DEFAULT_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "2"))
+DEFAULT_MAX_PAGES = int(os.getenv("SCRAPER_MAX_PAGES_PER_DRIVER", "50"))
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def build_chrome_options():
+    """Chrome options tuned for fast headless page loads"""
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+
+    # Speed optimizations
+    options.add_argument('--headless=new')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--disable-plugins')
+    options.add_argument('--disable-images')
+    # JavaScript stays on: pages only reach the browser when they need it to render
+    options.add_argument('--disable-css')
+    options.add_argument('--disable-background-timer-throttling')
+    options.add_argument('--disable-backgrounding-occluded-windows')
+    options.add_argument('--disable-renderer-backgrounding')
+    options.add_argument('--disable-features=TranslateUI')
+    options.add_argument('--disable-ipc-flooding-protection')
+    options.add_argument('--memory-pressure-off')
+    options.add_argument('--max_old_space_size=4096')
+
+    # Fastest page load strategy
+    options.page_load_strategy = 'eager'
+
+    # Check for system installed chromium (common in cloud environments)
+    chrome_binary = shutil.which("chromium") or shutil.which("google-chrome")
+    if chrome_binary:
+        options.binary_location = chrome_binary
+
+    return options
+
+
+def resolve_driver_path():
+    """Find chromedriver once per process instead of on every launch"""
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            # Use system chromedriver if available (matches package version), else use webdriver-manager
+            _driver_path = shutil.which("chromedriver")
+            if not _driver_path:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+        return _driver_path
+
+
+def create_driver():
+    """Launch a new headless Chrome instance"""
+    # Selenium is only imported once a browser is actually needed
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    with metrics.timer("driver_start_seconds"):
+        service = ChromeService(executable_path=resolve_driver_path())
+        driver = webdriver.Chrome(service=service, options=build_chrome_options())
+
+    # Set timeouts for faster failure
+    driver.set_page_load_timeout(8)
+    driver.implicitly_wait(2)
+    return driver
+
+
+class DriverPool:
+    """Fixed-size pool of warm Chrome drivers leased out one URL at a time.
+
+    Browsers are started on first demand and reused afterwards. Between
+    leases a driver is reset (cookies, storage, about:blank); it is replaced
+    after ``max_pages`` pages or as soon as a reset fails because the
+    browser crashed.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, max_pages=DEFAULT_MAX_PAGES, factory=create_driver):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.max_pages = max_pages
+        self._factory = factory
+        self._idle = queue.LifoQueue()  # LIFO keeps the most recently used browser hot
+        self._slots = threading.BoundedSemaphore(size)
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self, count=None):
+        """Start browsers ahead of the first request"""
+        drivers = [self._acquire() for _ in range(min(count or self.size, self.size))]
+        for driver in drivers:
+            self._idle.put(driver)
+            self._slots.release()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow a driver for a single page"""
+        driver = self._acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self._release(driver)
+
+    def shutdown(self):
+        """Quit every idle browser; leased ones are quit when returned"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
+
+    def _acquire(self, timeout=None):
+        if self._closed:
+            raise RuntimeError("Driver pool has been shut down")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free browser")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            driver = self._factory()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pages[id(driver)] = 0
+        return driver
+
+    def _release(self, driver):
+        try:
+            with self._lock:
+                pages = self._pages.get(id(driver), 0) + 1
+                self._pages[id(driver)] = pages
+                closed = self._closed
+
+            if closed:
+                self._quit(driver)
+            elif pages >= self.max_pages:
+                metrics.inc("driver_recycles_total", reason="max_pages")
+                self._quit(driver)
+            elif not self._reset(driver):
+                metrics.inc("driver_recycles_total", reason="reset_failed")
+                self._quit(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    def _reset(self, driver):
+        """Clear per-site state; returns False if the browser is unusable"""
+        try:
+            driver.delete_all_cookies()
+            try:
+                driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            except Exception:
+                # Storage is not reachable on some origins (e.g. data: or error pages)
+                pass
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    """Process-wide pool shared by scrape_website (survives Streamlit reruns)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DriverPool()
+        return _default_pool
+
+
+def shutdown_default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+atexit.register(shutdown_default_pool)
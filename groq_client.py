@@ -0,0 +1,264 @@
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+DEFAULT_GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# Account limits; the free tier for llama-3.3-70b is roughly 30 requests and 12k tokens per minute
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "12000"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Exponential backoff between retries: base * 2**attempt seconds, capped
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
+
+class GroqError(Exception):
+    """Non-retryable (or retries exhausted) error from the Groq API"""
+
+    def __init__(self, message, status_code=None, body=""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate_per_minute``"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = max(1.0, float(rate_per_minute))
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        """Block until ``amount`` tokens are available; returns seconds waited"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Seconds to wait before retry number ``attempt``, never less than ``retry_after``"""
+    # Full jitter keeps concurrent callers from retrying in lockstep
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    return delay if retry_after is None else max(delay, retry_after)
+
+
+def estimate_request_tokens(messages, max_tokens=None):
+    """Rough prompt+completion token count used for client-side TPM limiting"""
+    characters = sum(len(message.get("content", "")) for message in messages)
+    return characters / 4.0 + (max_tokens or 300)
+
+
+class GroqClient:
+    """Reusable Groq chat-completions client.
+
+    Holds a keep-alive ``requests.Session``, retries 429/5xx and connection
+    errors with jittered exponential backoff (honoring ``Retry-After``),
+    throttles itself with RPM/TPM token buckets and records per-request
+    latency. ``base_url`` can point at a local stub server for testing.
+    """
+
+    def __init__(self, api_key=None, base_url=None, timeout=20, max_retries=4,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, rpm=GROQ_RPM, tpm=GROQ_TPM, pool_size=8):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.base_url = (base_url or os.getenv("GROQ_BASE_URL") or DEFAULT_GROQ_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._requests_bucket = TokenBucket(rpm) if rpm else None
+        self._tokens_bucket = TokenBucket(tpm) if tpm else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._first_token_latencies = deque(maxlen=1000)
+        self._counters = {"requests": 0, "retries": 0, "errors": 0, "throttled_seconds": 0.0,
+                          "prompt_tokens": 0, "completion_tokens": 0}
+
+    def chat(self, messages, model, temperature=0.0, max_tokens=None, **extra):
+        """Send a chat completion and return the first choice's message content"""
+        payload = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        payload.update(extra)
+
+        result = self.post("/chat/completions", payload, estimate_request_tokens(messages, max_tokens))
+        usage = result.get("usage") or {}
+        with self._metrics_lock:
+            # Exact counts from the API, for cost tracking
+            self._counters["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self._counters["completion_tokens"] += usage.get("completion_tokens", 0)
+        metrics.inc("llm_tokens_total", usage.get("prompt_tokens", 0), backend="groq", kind="prompt")
+        metrics.inc("llm_tokens_total", usage.get("completion_tokens", 0), backend="groq", kind="completion")
+        choices = result.get("choices") or []
+        if not choices:
+            raise GroqError("Empty response from Groq")
+        return choices[0]["message"]["content"]
+
+    def stream_chat(self, messages, model, temperature=0.0, max_tokens=None, **extra):
+        """Yield content deltas of a streamed (SSE) chat completion as they arrive"""
+        payload = {"model": model, "messages": messages, "temperature": temperature, "stream": True}
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        payload.update(extra)
+
+        # Retries only apply until the response starts; a broken stream is raised to the caller
+        started = time.perf_counter()
+        response = self.post("/chat/completions", payload, estimate_request_tokens(messages, max_tokens), stream=True)
+        first_token = None
+        try:
+            # chunk_size=None hands over bytes as they arrive instead of waiting for 512-byte reads
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                        with self._metrics_lock:
+                            self._first_token_latencies.append(first_token)
+                    yield delta
+        finally:
+            response.close()
+
+    def post(self, path, payload, token_estimate=0.0, stream=False):
+        """POST with rate limiting and retries; returns the decoded JSON body (or the open response when streaming)"""
+        url = self.base_url + path
+        attempt = 0
+        while True:
+            self._throttle(token_estimate)
+            started = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self._record(time.perf_counter() - started, error=True)
+                    raise
+                self._backoff(attempt, None)
+                attempt += 1
+                continue
+
+            self._record(time.perf_counter() - started, error=response.status_code != 200)
+            if response.status_code == 200:
+                return response if stream else response.json()
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                # A streamed response holds its pooled connection until closed
+                response.close()
+                self._backoff(attempt, retry_after_seconds(response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            raise GroqError(
+                f"Groq API returned status code {response.status_code}: {response.text}",
+                status_code=response.status_code,
+                body=response.text,
+            )
+
+    def metrics(self):
+        """Request and token counters, and latency percentiles (seconds) for recent calls"""
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            first_tokens = sorted(self._first_token_latencies)
+            metrics = dict(self._counters)
+        if latencies:
+            metrics.update({
+                "latency_avg": round(sum(latencies) / len(latencies), 4),
+                "latency_p50": round(latencies[len(latencies) // 2], 4),
+                "latency_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+                "latency_max": round(latencies[-1], 4),
+            })
+        if first_tokens:
+            metrics["first_token_p50"] = round(first_tokens[len(first_tokens) // 2], 4)
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+    def _throttle(self, token_estimate):
+        waited = 0.0
+        if self._requests_bucket:
+            waited += self._requests_bucket.acquire(1)
+        if self._tokens_bucket and token_estimate:
+            waited += self._tokens_bucket.acquire(token_estimate)
+        if waited:
+            with self._metrics_lock:
+                self._counters["throttled_seconds"] += waited
+
+    def _backoff(self, attempt, retry_after):
+        delay = backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_cap)
+        with self._metrics_lock:
+            self._counters["retries"] += 1
+        metrics.inc("llm_retries_total", backend="groq")
+        time.sleep(delay)
+
+    def _record(self, latency, error=False):
+        with self._metrics_lock:
+            self._counters["requests"] += 1
+            if error:
+                self._counters["errors"] += 1
+            self._latencies.append(latency)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_groq_client():
+    """Process-wide client so every parse call shares one connection pool"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None or _default_client.api_key != os.getenv("GROQ_API_KEY"):
+            if _default_client is not None:
+                _default_client.close()
+            _default_client = GroqClient()
+        return _default_client
@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+import metrics
+from fs_utils import atomic_write, file_lock
+from url_utils import normalize_url
+
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", ".scrape_cache")
+CACHE_TTL = float(os.getenv("SCRAPER_CACHE_TTL", "3600"))
+CACHE_MAX_MB = float(os.getenv("SCRAPER_CACHE_MAX_MB", "256"))
+
+# Counter names reported as cache_requests_total{cache="html", result=...}
+_LOOKUP_RESULTS = {"hits": "hit", "misses": "miss", "revalidations": "revalidated"}
+
+# Run the LRU sweep once per this many stores
+EVICT_EVERY = 16
+
+# Blobs younger than this are never garbage collected, so a writer in another
+# process can still attach its metadata to a blob it has just written
+_BLOB_GRACE_SECONDS = 60
+
+
+class HTMLCache:
+    """Persistent cache of raw page HTML shared by every process on the host.
+
+    Entries are keyed by the normalized URL and point to gzip blobs named
+    after the SHA-256 of their content, so identical pages are stored once.
+    Each entry records the tier that fetched it and why HTTP would have
+    escalated, so callers can refuse an unrendered page.
+    Fresh entries (younger than ``ttl``) are served directly; stale ones are
+    revalidated with ETag/Last-Modified. The directory is kept under
+    ``max_bytes`` by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries_dir = os.path.join(directory, "entries")
+        self._blobs_dir = os.path.join(directory, "blobs")
+        self._lock_path = os.path.join(directory, ".lock")
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._blobs_dir, exist_ok=True)
+
+        self._counter_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "revalidations": 0,
+                          "stores": 0, "evictions": 0, "bytes_served": 0}
+        self._stores_since_evict = 0
+
+    def fetch(self, url, loader, accept=None):
+        """Return HTML for ``url`` from the cache, calling ``loader`` when needed.
+
+        ``loader(validators)`` receives ``{"etag", "last_modified"}`` of a
+        stale entry (or None) and returns a dict with ``html``, ``etag``,
+        ``last_modified``, ``not_modified`` (True when the origin answered
+        304) and optionally ``tier`` and ``reason``. Entries for which
+        ``accept(entry)`` is false are ignored and replaced.
+        """
+        entry = self.lookup(url)
+        if entry is not None and accept is not None and not accept(entry):
+            entry = None
+        if entry is not None and self.is_fresh(entry):
+            html = self.read(entry)
+            if html is not None:
+                self._count("hits")
+                self._count("bytes_served", len(html))
+                return html
+
+        validators = None
+        if entry is not None and (entry.get("etag") or entry.get("last_modified")):
+            validators = {"etag": entry.get("etag"), "last_modified": entry.get("last_modified")}
+
+        result = loader(validators)
+        if result.get("not_modified") and entry is not None:
+            html = self.read(entry)
+            if html is not None:
+                self._count("revalidations")
+                self._count("bytes_served", len(html))
+                self._write_entry(url, entry["blob"], entry.get("size", 0), entry.get("etag"),
+                                  entry.get("last_modified"), entry.get("tier"), entry.get("reason"))
+                return html
+            # Blob vanished underneath us; refetch unconditionally
+            result = loader(None)
+
+        self._count("misses")
+        html = result.get("html") or ""
+        if html:
+            self.store(url, html, result.get("etag"), result.get("last_modified"),
+                       result.get("tier"), result.get("reason"))
+        return html
+
+    def lookup(self, url):
+        """Metadata for ``url`` or None"""
+        try:
+            with open(self._entry_path(url), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def read(self, entry):
+        """Decompressed HTML for an entry (None if the blob is gone)"""
+        try:
+            with open(self._blob_path(entry["blob"]), "rb") as handle:
+                html = gzip.decompress(handle.read()).decode("utf-8")
+        except (OSError, KeyError, EOFError, gzip.BadGzipFile):
+            return None
+        # Entry mtime doubles as the LRU access time
+        try:
+            os.utime(self._entry_path(entry["url"]))
+        except OSError:
+            pass
+        return html
+
+    def store(self, url, html, etag=None, last_modified=None, tier=None, reason=None):
+        data = html.encode("utf-8")
+        blob = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(blob)
+        if os.path.exists(blob_path):
+            os.utime(blob_path)  # keep a reused blob out of the GC grace window
+        else:
+            atomic_write(blob_path, gzip.compress(data, compresslevel=6))
+
+        self._write_entry(url, blob, os.path.getsize(blob_path), etag, last_modified, tier, reason)
+        self._count("stores")
+
+        # A full directory scan per store would dominate small pages, so evict periodically
+        with self._counter_lock:
+            self._stores_since_evict += 1
+            due = self._stores_since_evict >= EVICT_EVERY
+            if due:
+                self._stores_since_evict = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with file_lock(self._lock_path):
+            entries = []
+            referenced = set()
+            for name in os.listdir(self._entries_dir):
+                path = os.path.join(self._entries_dir, name)
+                try:
+                    with open(path, "r", encoding="utf-8") as handle:
+                        entry = json.load(handle)
+                    entries.append((os.path.getmtime(path), path, entry))
+                    referenced.add(entry["blob"])
+                except (OSError, ValueError, KeyError):
+                    continue
+
+            blob_sizes = {}
+            now = time.time()
+            for name in os.listdir(self._blobs_dir):
+                path = os.path.join(self._blobs_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.startswith(".tmp-"):
+                    continue
+                if name not in referenced and now - stat.st_mtime > _BLOB_GRACE_SECONDS:
+                    self._unlink(path)
+                    continue
+                blob_sizes[name] = stat.st_size
+
+            total = sum(blob_sizes.values())
+            if total <= self.max_bytes:
+                return
+
+            entries.sort(key=lambda item: item[0])
+            users = {}
+            for _, _, entry in entries:
+                users[entry["blob"]] = users.get(entry["blob"], 0) + 1
+
+            for _, path, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                self._unlink(path)
+                self._count("evictions")
+                users[entry["blob"]] -= 1
+                if users[entry["blob"]] == 0:
+                    self._unlink(self._blob_path(entry["blob"]))
+                    total -= blob_sizes.get(entry["blob"], 0)
+
+    def stats(self):
+        """Hit/miss/revalidation counters for this process"""
+        with self._counter_lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["revalidations"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["revalidations"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with file_lock(self._lock_path):
+            for directory in (self._entries_dir, self._blobs_dir):
+                for name in os.listdir(directory):
+                    self._unlink(os.path.join(directory, name))
+
+    def _write_entry(self, url, blob, size, etag, last_modified, tier=None, reason=None):
+        entry = {
+            "url": normalize_url(url),
+            "blob": blob,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "size": size,
+            "tier": tier,
+            "reason": reason,
+        }
+        atomic_write(self._entry_path(url), json.dumps(entry).encode("utf-8"))
+
+    def _entry_path(self, url):
+        key = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self._entries_dir, key + ".json")
+
+    def _blob_path(self, blob):
+        return os.path.join(self._blobs_dir, blob)
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self._counters[name] += amount
+        if name in _LOOKUP_RESULTS:
+            metrics.inc("cache_requests_total", amount, cache="html", result=_LOOKUP_RESULTS[name])
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Shared cache configured from SCRAPER_CACHE_*; None when SCRAPER_CACHE_DIR is empty"""
+    global _default_cache
+    if not CACHE_DIR:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HTMLCache()
+        return _default_cache
@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+from collections import Counter, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# urllib3 only decodes brotli bodies when a brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+HTTP_TIMEOUT = float(os.getenv("SCRAPER_HTTP_TIMEOUT", "10"))
+MIN_TEXT_CHARS = int(os.getenv("SCRAPER_MIN_TEXT_CHARS", "200"))
+POOL_MAXSIZE = int(os.getenv("SCRAPER_HTTP_POOL_SIZE", "16"))
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# Mount points used by common client-side frameworks (React, Vue, Next, Nuxt, Gatsby, Angular)
+SPA_ROOT_IDS = ("root", "app", "__next", "__nuxt", "___gatsby", "svelte", "app-root")
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared keep-alive session; connections are reused per host across threads"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Accept-Language": "en-US,en;q=0.9",
+            })
+            _session = session
+        return _session
+
+
+def fetch(url, headers=None, timeout=HTTP_TIMEOUT):
+    """GET a URL through the pooled session with a sane text encoding"""
+    response = get_session().get(url, headers=headers, timeout=timeout)
+
+    # requests falls back to ISO-8859-1 when the header has no charset; prefer the page's own
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        match = _META_CHARSET.search(response.content[:2048])
+        response.encoding = match.group(1).decode("ascii") if match else "utf-8"
+    return response
+
+
+def _text_chars(element, limit):
+    """Characters of stripped visible text under ``element``, counted up to ``limit``"""
+    total = 0
+    for text in element.itertext():
+        total += len(text.strip())
+        if total >= limit:
+            break
+    return total
+
+
+def needs_javascript(html, min_text_chars=MIN_TEXT_CHARS):
+    """Return why a page needs a real browser, or None if the HTML is usable as-is"""
+    if not html or not html.strip():
+        return "empty document"
+
+    # Deferred so importing http_fetch stays cheap; scrape has usually loaded lxml already
+    import lxml.html
+    from lxml import etree
+
+    try:
+        document = lxml.html.document_fromstring(html.encode("utf-8") if isinstance(html, str) else html,
+                                                 parser=lxml.html.HTMLParser(encoding="utf-8", huge_tree=True))
+    except etree.ParserError:
+        return "empty document"
+    body = document.find("body")
+    if body is None:
+        return "no body"
+
+    etree.strip_elements(body, etree.Comment, "script", "style", "noscript", "template", with_tail=False)
+
+    # One pass over the elements that have an id, instead of one tree search per framework
+    roots = {}
+    for element in body.xpath(".//*[@id]"):
+        roots.setdefault(element.get("id"), element)
+    for root_id in SPA_ROOT_IDS:
+        root = roots.get(root_id)
+        if root is not None and _text_chars(root, min_text_chars) < min_text_chars:
+            return f"empty SPA root #{root_id}"
+
+    text_length = _text_chars(body, min_text_chars)
+    if text_length == 0:
+        return "empty body"
+    if text_length < min_text_chars:
+        return f"text below threshold ({text_length} chars)"
+    return None
+
+
+# --- Tier bookkeeping, used to tune the escalation heuristic ---
+_tier_lock = threading.Lock()
+_tier_counts = Counter()
+_escalations = Counter()
+_recent = deque(maxlen=500)
+
+
+def record_tier(url, tier, reason=None):
+    """Remember which tier served a URL and why it escalated (if it did)"""
+    with _tier_lock:
+        _tier_counts[tier] += 1
+        if reason:
+            _escalations[re.split(r"[:(]", reason)[0].strip()] += 1
+        _recent.append({"url": url, "tier": tier, "reason": reason})
+    if reason and tier == "browser":
+        metrics.inc("browser_escalations_total", reason=re.split(r"[:(]", reason)[0].strip())
+
+
+def tier_stats():
+    """Snapshot of tier usage, escalation reasons and the most recent decisions"""
+    with _tier_lock:
+        return {
+            "tiers": dict(_tier_counts),
+            "escalations": dict(_escalations),
+            "recent": list(_recent),
+        }
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from fs_utils import atomic_write
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def make_key(**parts):
+    """Stable hash of everything that determines an LLM answer"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Memoizes LLM answers in an in-process LRU, optionally backed by a directory.
+
+    The on-disk store is shared between processes (Streamlit workers, batch
+    jobs) and entries expire after ``ttl`` seconds in both layers.
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_SIZE, directory=LLM_CACHE_DIR, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.directory = directory or None
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key):
+        """Cached answer for ``key`` or None"""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if now - item[1] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    metrics.inc("cache_requests_total", cache="llm", result="hit")
+                    return item[0]
+                del self._memory[key]
+
+        value, created = self._read_disk(key)
+        if value is not None and now - created < self.ttl:
+            self._remember(key, value, created)
+            with self._lock:
+                self._counters["disk_hits"] += 1
+            metrics.inc("cache_requests_total", cache="llm", result="disk_hit")
+            return value
+
+        with self._lock:
+            self._counters["misses"] += 1
+        metrics.inc("cache_requests_total", cache="llm", result="miss")
+        return None
+
+    def set(self, key, value):
+        created = time.time()
+        self._remember(key, value, created)
+        if self.directory:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, json.dumps({"created": created, "value": value}).encode("utf-8"))
+        with self._lock:
+            self._counters["stores"] += 1
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """Return the cached answer or compute, store (if ``cacheable``) and return it"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None and (cacheable is None or cacheable(value)):
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def prune(self):
+        """Delete expired answers from the on-disk store"""
+        if not self.directory:
+            return 0
+        removed = 0
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) >= self.ttl:
+                        os.unlink(path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    def _remember(self, key, value, created):
+        with self._lock:
+            self._memory[key] = (value, created)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None, 0
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as handle:
+                item = json.load(handle)
+            return item["value"], item["created"]
+        except (OSError, ValueError, KeyError):
+            return None, 0
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache shared by Streamlit reruns and batch runs"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
@@ -2,7 +2,14 @@
 
 import streamlit as st
 import time
-from scrape import scrape_website, extract_body_content, clean_body_content
+from scrape import scrape_website, clean_html
+from parse import BACKEND_MODELS
+from structured import answer_query, extract_structured
+from dedup import dedup_text
+import metrics
+
+# Serves /metrics (Prometheus) and /metrics.json when METRICS_PORT is set; no-op on reruns
+metrics.start_http_server()
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -142,31 +149,63 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+def metric_card(label, value):
+    return f"""
+        <div class="metric-container">
+            <div style="font-size: 0.9rem; color: #667eea;">{label}</div>
+            <div style="font-size: 1.5rem; font-weight: 700; color: white;">{value}</div>
+        </div>
+        """
+
+
+def render_statistics(box):
+    """Live counters and stage latencies from the process-wide metrics registry"""
+    registry = metrics.get_default_registry()
+    cache_lookups = registry.total("cache_requests_total")
+    cache_misses = registry.total("cache_requests_total", result="miss")
+    cards = [
+        ("Websites Scraped", f"{registry.total('scrapes_total'):,}"),
+        ("LLM Calls", f"{registry.total('llm_request_seconds'):,}"),
+        ("Prompt Tokens", f"{registry.total('llm_tokens_total', kind='prompt'):,}"),
+        ("Cache Hit Rate", f"{(cache_lookups - cache_misses) / cache_lookups:.0%}" if cache_lookups else "-"),
+    ]
+    with box.container():
+        for row in (cards[:2], cards[2:]):
+            for column, (label, value) in zip(st.columns(2), row):
+                column.markdown(metric_card(label, value), unsafe_allow_html=True)
+        timings = [
+            {"stage": name.replace("_seconds", ""), **series["labels"], "calls": series["count"],
+             "p50 ms": round(series["p50"] * 1000, 1), "p95 ms": round(series["p95"] * 1000, 1)}
+            for name, histogram in metrics.snapshot()["histograms"].items() for series in histogram
+        ]
+        if timings:
+            with st.expander("⏱️ Stage Timings", expanded=False):
+                st.dataframe(timings, hide_index=True, use_container_width=True)
+
+
 # --- SIDEBAR (SETTINGS) ---
 with st.sidebar:
     st.markdown("### ⚙️ Settings")
     headless = st.toggle("Headless Mode", value=True)
+    main_content_only = st.toggle("Main Content Only", value=False,
+                                  help="Drop navigation, cookie banners, footers and sidebars before parsing")
+    skip_repeats = st.toggle("Skip Repeated Text", value=False,
+                             help="Drop long lines and blocks of short lines that repeat within the page before parsing")
+    content_format = st.selectbox("Content Format", ["Text", "Markdown"],
+                                  help="Markdown keeps headings, lists and whole table rows")
     wait_time = st.slider("Page Load Wait Time (seconds)", 1, 5, 2)
-    ai_model = st.selectbox("AI Model", ["llama3", "gpt-4", "mistral"])
-    chunk_size = st.slider("Max Chunk Size", 2000, 5000, 4000, step=500)
+    ai_backend = st.selectbox("AI Backend", ["groq", "ollama"], format_func=str.capitalize)
+    ai_model = st.selectbox("AI Model", BACKEND_MODELS[ai_backend])
+    structured_first = st.toggle("Answer From Structured Data", value=True,
+                                 help="Answer from JSON-LD, microdata, meta tags and tables without an LLM call when they match")
+    relevance_filter = st.toggle("Send Only Relevant Passages", value=True)
+    fit_context = st.toggle("Fit Chunks to Model Context", value=True)
+    chunk_size = None if fit_context else st.slider("Max Chunk Size", 2000, 5000, 4000, step=500)
     
     st.markdown("---")
     st.markdown("### 📊 Statistics")
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("""
-        <div class="metric-container">
-            <div style="font-size: 0.9rem; color: #667eea;">Websites Scraped</div>
-            <div style="font-size: 1.5rem; font-weight: 700; color: white;">1</div>
-        </div>
-        """, unsafe_allow_html=True)
-    with col2:
-        st.markdown("""
-        <div class="metric-container">
-            <div style="font-size: 0.9rem; color: #667eea;">Content Parsed</div>
-            <div style="font-size: 1.5rem; font-weight: 700; color: white;">0</div>
-        </div>
-        """, unsafe_allow_html=True)
+    # Filled in at the end of the run, so it includes this run's scrape and parse
+    stats_box = st.empty()
 
 # --- MAIN CONTENT ---
 col1, col2 = st.columns([2, 1])
@@ -197,9 +236,13 @@ with col1:
             try:
                 result = scrape_website(url)
                 if result:
-                    body_content = extract_body_content(result)
-                    cleaned_content = clean_body_content(body_content)
+                    cleaned_content = clean_html(result, main_content=main_content_only,
+                                                 output=content_format.lower())
+                    if skip_repeats:
+                        cleaned_content = dedup_text(cleaned_content)
                     st.session_state.dom_content = cleaned_content
+                    # Cleaning drops <script>, so read JSON-LD and friends from the raw page now
+                    st.session_state.structured = extract_structured(result)
                     st.session_state.current_url = url
                     
                     # Show success message
@@ -249,24 +292,53 @@ with col1:
             # Set processing state
             st.session_state.is_processing = True
             
-            # Create a progress bar for AI processing
+            # Real progress: tokens for a single chunk, finished chunks otherwise
             progress_bar = st.progress(0)
             status_text = st.empty()
-            
-            # Update progress and status
-            status_text.text("🤖 Initializing AI processing...")
-            progress_bar.progress(25)
-            
-            status_text.text("🤖 Analyzing content structure...")
-            progress_bar.progress(50)
-            
-            status_text.text("🤖 Extracting information with AI...")
-            progress_bar.progress(75)
+            stream_box = st.empty()
             
             try:
-                from parse import parse_with_groq
+                from parse import STREAMERS, count_prompt_tokens, finish_answer, parse_chunks, relevant_content, \
+                    split_for_model
                 
-                result = parse_with_groq(st.session_state.dom_content, parse_description)
+                started = time.perf_counter()
+                content = st.session_state.dom_content
+                fast_answer = None
+                if structured_first:
+                    fast_answer = answer_query(st.session_state.get("structured"), parse_description)
+                if fast_answer:
+                    # The page's own structured data answers the query: no LLM round-trip
+                    result = fast_answer
+                    job = {"processed": 0, "chunks": 0, "elapsed": time.perf_counter() - started,
+                           "prompt_tokens": 0, "structured": True}
+                else:
+                    if relevance_filter:
+                        # Rank passages locally and drop nav, footer and legal text before calling the model
+                        content = relevant_content(content, parse_description, ai_backend, ai_model)
+                    chunks = split_for_model(content, parse_description, ai_backend, ai_model, chunk_size)
+                    if len(chunks) == 1:
+                        # One LLM call: stream its tokens so the first words show up immediately
+                        status_text.text("🤖 Extracting information with AI...")
+                        with stream_box.container():
+                            streamed = st.write_stream(STREAMERS[ai_backend](chunks[0], parse_description,
+                                                                         max_chars=None, model=ai_model))
+                        result = finish_answer(ai_backend, streamed if isinstance(streamed, str)
+                                               else "".join(map(str, streamed)))
+                        if not result:
+                            result = "No matching information found"
+                        job = {"processed": 1, "chunks": 1, "elapsed": time.perf_counter() - started,
+                               "prompt_tokens": count_prompt_tokens(chunks[0], parse_description)}
+                    else:
+                        def show_progress(done, total):
+                            status_text.text(f"🤖 Parsed {done}/{total} chunks...")
+                            progress_bar.progress(done / total)
+                    
+                        status_text.text(f"🤖 Parsing {len(chunks)} chunks...")
+                        # Parse every chunk of the page (not just the first few KB) and merge the answers
+                        job = parse_chunks(content, parse_description,
+                                           chunk_size=chunk_size, backend=ai_backend, model=ai_model,
+                                           on_progress=show_progress)
+                        result = job["result"]
                 
                 # Complete the progress bar
                 status_text.text("🤖 Processing complete!")
@@ -275,8 +347,14 @@ with col1:
                 # Store the result
                 st.session_state.parsed_result = result
                 
-                if result and result.strip() and result != "No matching information found":
-                    st.success("✅ Parsing complete!")
+                if job.get("structured"):
+                    st.success(f"✅ Answered from the page's structured data in {job['elapsed'] * 1000:.0f} ms "
+                               f"(no LLM call)")
+                elif result and result.strip() and result != "No matching information found" and not result.startswith("Error"):
+                    st.success(f"✅ Parsing complete! Processed {job['processed']}/{job['chunks']} chunks "
+                               f"(~{job['prompt_tokens']:,} prompt tokens) in {job['elapsed']:.1f}s")
+                elif result.startswith("Error"):
+                    st.error(f"❌ {result}")
                 else:
                     st.warning("⚠️ No matching information found")
                     st.info("💡 Try being more specific in your query. For example:")
@@ -294,6 +372,8 @@ with col1:
                 # Clear progress bar and status
                 progress_bar.empty()
                 status_text.empty()
+                # The result card below shows the final answer
+                stream_box.empty()
                 # Clear processing state
                 st.session_state.is_processing = False
         
@@ -352,6 +432,8 @@ with col2:
     if is_processing:
         st.markdown('</div>', unsafe_allow_html=True)
 
+render_statistics(stats_box)
+
 # --- FOOTER ---
 st.markdown("---")
 st.markdown(
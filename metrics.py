@@ -0,0 +1,251 @@
+"""In-process counters and histograms for every scrape and parse stage, with Prometheus/JSON export."""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Recording is a dict update under one lock (see benchmarks/bench_metrics); 0 turns every call into a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# Port for the /metrics (Prometheus) and /metrics.json endpoints; 0 disables the server
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Upper bounds in seconds, from a cached lookup to a slow browser render or LLM call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "scrapes_total": "Pages requested through scrape_website",
+    "page_load_seconds": "Time to fetch or render one page, by tier",
+    "driver_start_seconds": "Time to launch a Chrome instance",
+    "driver_recycles_total": "Browsers quit and replaced, by reason (max_pages or reset_failed)",
+    "page_bytes_total": "Bytes of HTML received, by tier",
+    "browser_escalations_total": "Pages the HTTP tier handed to the browser, by reason",
+    "clean_seconds": "Time to turn raw HTML into page text, by function",
+    "cleaned_chars_total": "Characters of page text produced by cleaning",
+    "chunk_seconds": "Time to split page text into chunks",
+    "chunks_total": "Chunks produced by split_dom_content",
+    "llm_request_seconds": "Time for one LLM call (or whole stream), by backend and model",
+    "llm_tokens_total": "LLM tokens, by backend and kind (prompt or completion)",
+    "llm_retries_total": "LLM requests retried after a throttle, server error or dropped connection",
+    "cache_requests_total": "Cache lookups, by cache and result",
+    "structured_answers_total": "Queries tried on the structured-data fast path, by result",
+    "singleflight_calls_total": "Coalescable calls, by result (executed or coalesced)",
+    "crawl_pages_total": "Pages handled by the crawler, by status",
+    "crawl_links_total": "Links found by the crawler, by what happened to them",
+    "dedup_lines_total": "Lines checked by the deduplicator, by result (kept, exact, near or runs)",
+    "dedup_saved_chars_total": "Characters the deduplicator kept out of LLM prompts",
+    "dedup_saved_tokens_total": "Estimated tokens the deduplicator kept out of LLM prompts",
+    "errors_total": "Exceptions raised inside a timed stage",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Registry:
+    """Thread-safe store of labelled counters and fixed-bucket histograms"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled=METRICS_ENABLED):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}    # name -> {label key: value}
+        self._histograms = {}  # name -> {label key: [bucket counts..., +Inf count, sum]}
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the ``with`` block; exceptions also count as stage errors"""
+        # Histograms are named <stage>_seconds, so errors land in errors_total{stage="<stage>"}
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("errors_total", stage=name[:-len("_seconds")] if name.endswith("_seconds") else name)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def _copy(self):
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {key: list(counts) for key, counts in series.items()}
+                          for name, series in self._histograms.items()}
+        return counters, histograms
+
+    def _quantile(self, counts, q):
+        """Bucket-interpolated estimate, as Prometheus' histogram_quantile computes it"""
+        total = sum(counts[:-1])
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts[:-1]):
+            if seen + count >= rank and count:
+                if index >= len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        """JSON-ready {"counters": {name: [...]}, "histograms": {name: [...]}}"""
+        counters, histograms = self._copy()
+        return {
+            "counters": {
+                name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                for name, series in sorted(counters.items())
+            },
+            "histograms": {
+                name: [{
+                    "labels": dict(key),
+                    "count": sum(counts[:-1]),
+                    "sum": round(counts[-1], 6),
+                    "p50": round(self._quantile(counts, 0.5), 6),
+                    "p95": round(self._quantile(counts, 0.95), 6),
+                } for key, counts in sorted(series.items())]
+                for name, series in sorted(histograms.items())
+            },
+        }
+
+    def total(self, name, **labels):
+        """Sum of a counter (or a histogram's observation count) over series matching ``labels``"""
+        wanted = set(labels.items())
+        with self._lock:
+            if name in self._counters:
+                return sum(value for key, value in self._counters[name].items() if wanted <= set(key))
+            series = self._histograms.get(name, {})
+            return sum(sum(counts[:-1]) for key, counts in series.items() if wanted <= set(key))
+
+    def prometheus_text(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        counters, histograms = self._copy()
+        lines = []
+        for name, series in sorted(counters.items()):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(histograms.items()):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, counts in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {counts[-1]}")
+                lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+_default_registry = Registry()
+
+
+def get_default_registry():
+    """Process-wide registry every module records into"""
+    return _default_registry
+
+
+def inc(name, value=1, **labels):
+    _default_registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _default_registry.observe(name, value, **labels)
+
+
+def timer(name, **labels):
+    return _default_registry.timer(name, **labels)
+
+
+def snapshot():
+    return _default_registry.snapshot()
+
+
+def prometheus_text():
+    return _default_registry.prometheus_text()
+
+
+def _render(path):
+    """(body, content type) for an endpoint path, or None"""
+    if path == "/metrics":
+        return prometheus_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    if path == "/metrics.json":
+        return json.dumps(snapshot()).encode("utf-8"), "application/json"
+    return None
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=METRICS_PORT, host="127.0.0.1"):
+    """Serve /metrics and /metrics.json from a daemon thread; idempotent, so Streamlit reruns are safe"""
+    global _server
+    # http.server is only imported by processes that expose the endpoint
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            rendered = _render(self.path.split("?", 1)[0])
+            if rendered is None:
+                self.send_error(404)
+                return
+            body, content_type = rendered
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    with _server_lock:
+        if _server is None and port:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
@@ -1,5 +1,35 @@
-from langchain_ollama import OllamaLLM
-from langchain_core.prompts import ChatPromptTemplate
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from groq_client import GROQ_TPM, GroqError, get_groq_client
+import metrics
+from llm_cache import get_response_cache, make_key
+from retrieval import RETRIEVAL_TOKENS, select_relevant
+from singleflight import get_default_flight
+from tokens import content_budget, estimate_tokens, pack_content
+
+# Bump whenever the template or answer post-processing changes, so cached answers are not reused
+PROMPT_VERSION = 2
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+OLLAMA_MODEL = "llama3"
+TEMPERATURE = 0.0
+
+# Ollama only uses this much context unless told otherwise (its own default is 2048)
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "8192"))
+
+# Models offered per backend in the UI; the first one is the default
+BACKEND_MODELS = {
+    "groq": [GROQ_MODEL, "llama-3.1-8b-instant", "gemma2-9b-it"],
+    "ollama": [OLLAMA_MODEL, "llama3.1", "mistral"],
+}
+
+SYSTEM_PROMPT = "You are a helpful web scraping assistant. Extract information precisely."
 
 # Perfect template for all query types
 template = (
@@ -16,72 +46,234 @@ template = (
     "8. Use tables when appropriate for structured data"
 )
 
-# Optimized model configuration
-model = OllamaLLM(
-    model="llama3",
-    temperature=0.0,
-    max_tokens=300,
-    timeout=20
+# Final step of reduce="llm": combine the per-chunk answers instead of extracting from them again
+reduce_template = (
+    "Partial answers, each extracted from a different part of the same page:\n{answers}\n\n"
+    "Query: {parse_description}\n\n"
+    "Instructions:\n"
+    "1. Combine the partial answers into one answer to the query\n"
+    "2. Merge duplicates and keep every distinct item; do not add anything that is not in them\n"
+    "3. Drop partial answers that say 'No matching information found'\n"
+    "4. Keep the format of the partial answers; merge tables into a single table\n"
+    "5. Keep the answer concise and well-organized"
 )
 
-def perse_with_Ollama(dom_content, parse_description):
+NO_MATCH = "No matching information found"
+
+
+def prompt_overhead(parse_description):
+    """Tokens of the system prompt and template around the page content"""
+    prompt = template.format(dom_content="", parse_description=parse_description)
+    return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt)
+
+
+def count_prompt_tokens(content, parse_description):
+    """Estimated prompt tokens of one request, for cost and latency tracking"""
+    return prompt_overhead(parse_description) + estimate_tokens(content)
+
+
+# --- Backend registry: one client and prompt chain per (backend, model, temperature) ---
+class OllamaBackend:
+    """``prompt | OllamaLLM`` chain, built once and reused for every call"""
+
+    def __init__(self, model_name, temperature):
+        # Imported here so Groq-only sessions never pay for langchain
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_ollama import OllamaLLM
+
+        self.model_name = model_name
+        self.temperature = temperature
+        # Optimized model configuration
+        llm = OllamaLLM(model=model_name, temperature=temperature, max_tokens=300, timeout=20,
+                        num_ctx=OLLAMA_NUM_CTX)
+        self.chain = ChatPromptTemplate.from_template(template) | llm
+        self.reduce_chain = ChatPromptTemplate.from_template(reduce_template) | llm
+
+    def content_budget(self, parse_description):
+        """Page-content tokens that fit in one request"""
+        return content_budget(self.model_name, prompt_overhead(parse_description), cap=OLLAMA_NUM_CTX)
+
+    def invoke(self, content, parse_description):
+        with metrics.timer("llm_request_seconds", backend="ollama", model=self.model_name):
+            response = self.chain.invoke({"dom_content": content, "parse_description": parse_description})
+        answer = response.content if hasattr(response, "content") else str(response)
+        # Ollama reports no usage through langchain; count estimates instead
+        metrics.inc("llm_tokens_total", count_prompt_tokens(content, parse_description), backend="ollama",
+                    kind="prompt")
+        metrics.inc("llm_tokens_total", estimate_tokens(answer), backend="ollama", kind="completion")
+        return answer
+
+    def stream(self, content, parse_description):
+        return self.chain.stream({"dom_content": content, "parse_description": parse_description})
+
+    def reduce(self, answers, parse_description):
+        with metrics.timer("llm_request_seconds", backend="ollama", model=self.model_name):
+            response = self.reduce_chain.invoke({"answers": answers, "parse_description": parse_description})
+        return response.content if hasattr(response, "content") else str(response)
+
+
+class GroqBackend:
+    """Chat-completions requests for one model over the shared ``GroqClient``"""
+
+    def __init__(self, model_name, temperature):
+        self.model_name = model_name
+        self.temperature = temperature
+
+    def content_budget(self, parse_description):
+        """Page-content tokens that fit in one request; a request can never exceed the TPM quota"""
+        return content_budget(self.model_name, prompt_overhead(parse_description), cap=GROQ_TPM)
+
+    def messages(self, content, parse_description):
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": template.format(dom_content=content, parse_description=parse_description)},
+        ]
+
+    def invoke(self, content, parse_description):
+        # The client is looked up per call so a changed GROQ_API_KEY takes effect
+        with metrics.timer("llm_request_seconds", backend="groq", model=self.model_name):
+            return get_groq_client().chat(self.messages(content, parse_description),
+                                          model=self.model_name, temperature=self.temperature)
+
+    def stream(self, content, parse_description):
+        return get_groq_client().stream_chat(self.messages(content, parse_description),
+                                             model=self.model_name, temperature=self.temperature)
+
+    def reduce(self, answers, parse_description):
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": reduce_template.format(answers=answers, parse_description=parse_description)},
+        ]
+        with metrics.timer("llm_request_seconds", backend="groq", model=self.model_name):
+            return get_groq_client().chat(messages, model=self.model_name, temperature=self.temperature)
+
+
+BACKEND_TYPES = {
+    "groq": GroqBackend,
+    "ollama": OllamaBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(backend, model_name=None, temperature=TEMPERATURE):
+    """Cached backend for (backend, model, temperature), created on first use.
+
+    The registry lives at module level, so it survives Streamlit reruns; the
+    arguments are hashable, so it can also be wrapped in ``st.cache_resource``.
+    """
+    key = (backend, model_name or BACKEND_MODELS[backend][0], temperature)
+    with _backends_lock:
+        instance = _backends.get(key)
+        if instance is None:
+            instance = _backends[key] = BACKEND_TYPES[backend](key[1], temperature)
+        return instance
+
+
+def response_key(backend, model_name, arguments):
+    """Cache key for one LLM answer; shared by the sync parsers and the async pipeline"""
+    return make_key(
+        backend=backend,
+        model=model_name,
+        prompt_version=PROMPT_VERSION,
+        temperature=TEMPERATURE,
+        arguments=arguments,
+    )
+
+
+def cached_response(backend):
+    """Memoize a parse function on (content, query, model, prompt version, temperature).
+
+    Temperature is 0.0, so identical inputs give reusable answers. Errors are
+    never cached. A ``model`` argument of None means the backend's default.
+    Identical calls already in flight share one LLM request; across processes
+    too when LLM_CACHE_DIR gives them a shared cache to read the answer from.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            arguments = dict(arguments.arguments)
+            model_name = arguments.pop("model", None) or BACKEND_MODELS[backend][0]
+            key = response_key(backend, model_name, arguments)
+            cache = get_response_cache()
+            return get_default_flight().do(
+                "llm:" + key,
+                lambda: cache.get_or_compute(
+                    key,
+                    lambda: func(*args, **kwargs),
+                    cacheable=lambda result: isinstance(result, str) and not result.startswith("Error"),
+                ),
+                cross_process=cache.directory is not None,
+            )
+
+        return wrapper
+    return decorator
+
+
+def _clean_ollama_answer(result):
+    """Ollama answer without chatty prefixes and trailing notes"""
+    # Perfect cleaning logic
+    if result and result.strip():
+        clean_result = result.strip()
+        
+        # Remove verbose prefixes but keep actual content
+        verbose_prefixes = [
+            "Here is the extracted information:",
+            "Here's the extracted information:",
+            "Based on the content:",
+            "The answer to your question is:",
+            "According to the provided content:"
+        ]
+        
+        for prefix in verbose_prefixes:
+            if clean_result.startswith(prefix):
+                clean_result = clean_result[len(prefix):].strip()
+                break
+        
+        # Remove trailing explanations
+        if "Let me know" in clean_result:
+            clean_result = clean_result.split("Let me know")[0]
+        if "Note:" in clean_result:
+            clean_result = clean_result.split("Note:")[0]
+        
+        final_result = clean_result.strip()
+        
+        # Return only if meaningful
+        if len(final_result) > 10:
+            return final_result
+        else:
+            return "No matching information found"
+    else:
+        return "No matching information found"
+
+
+def finish_answer(backend, text):
+    """Final form of a raw model answer, as the backend's parse function returns it"""
+    return _clean_ollama_answer(text) if backend == "ollama" else text.strip()
+
+
+@cached_response("ollama")
+def perse_with_Ollama(dom_content, parse_description, max_chars=None, model=None):
     """Perfect parser that handles all query types accurately"""
     
     if not dom_content or not parse_description:
         return "No content to parse"
     
     try:
-        # Use optimal content length
-        content = dom_content[:4000]
+        # Fill the model's context window; ``max_chars`` is an optional hard cap on top
+        content = dom_content[:max_chars] if max_chars else dom_content
+        backend = get_backend("ollama", model)
+        content = pack_content(content, backend.content_budget(parse_description))
         
-        prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | model
-        
-        response = chain.invoke({
-            "dom_content": content,
-            "parse_description": parse_description
-        })
-        
-        # Get result
-        if hasattr(response, 'content'):
-            result = response.content
-        else:
-            result = str(response)
+        result = backend.invoke(content, parse_description)
         
-        # Perfect cleaning logic
-        if result and result.strip():
-            clean_result = result.strip()
-            
-            # Remove verbose prefixes but keep actual content
-            verbose_prefixes = [
-                "Here is the extracted information:",
-                "Here's the extracted information:",
-                "Based on the content:",
-                "The answer to your question is:",
-                "According to the provided content:"
-            ]
-            
-            for prefix in verbose_prefixes:
-                if clean_result.startswith(prefix):
-                    clean_result = clean_result[len(prefix):].strip()
-                    break
-            
-            # Remove trailing explanations
-            if "Let me know" in clean_result:
-                clean_result = clean_result.split("Let me know")[0]
-            if "Note:" in clean_result:
-                clean_result = clean_result.split("Note:")[0]
-            
-            final_result = clean_result.strip()
-            
-            # Return only if meaningful
-            if len(final_result) > 10:
-                return final_result
-            else:
-                return "No matching information found"
-        else:
-            return "No matching information found"
-            
+        return _clean_ollama_answer(result)
+
     except Exception as e:
         # Better error handling
         error_msg = str(e)
@@ -93,52 +285,245 @@ def perse_with_Ollama(dom_content, parse_description):
             return f"Error: {error_msg}"
 
 
-def parse_with_groq(dom_content, parse_description):
+@cached_response("groq")
+def parse_with_groq(dom_content, parse_description, max_chars=None, model=None):
     """Parse content using Groq's ultra-fast API"""
-    import os
-    import requests
-    import json
-    
     # You can hardcode your key here for testing, or set it in environment variables
     # api_key = "gsk_..." 
     api_key = os.getenv("GROQ_API_KEY")
     
     if not api_key:
         return "Error: GROQ_API_KEY not found. Please set your API key in environment variables or hardcode it in parse.py"
-        
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # Use optimal content length for Llama 3 on Groq (8k context usually)
-    content = dom_content[:6000]
     
-    prompt = template.format(dom_content=content, parse_description=parse_description)
-    
-    payload = {
-        "model": "llama-3.3-70b-versatile", # Updated to latest supported model
-        "messages": [
-            {"role": "system", "content": "You are a helpful web scraping assistant. Extract information precisely."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.0
-    }
+    # Pack as much content as the model's context (and the TPM quota) allows
+    content = dom_content[:max_chars] if max_chars else dom_content
+    backend = get_backend("groq", model)
+    content = pack_content(content, backend.content_budget(parse_description))
     
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=20)
-        
-        if response.status_code == 200:
-            result = response.json()
-            if "choices" in result and len(result["choices"]) > 0:
-                content = result["choices"][0]["message"]["content"]
-                return content.strip()
-            else:
-                return "Error: Empty response from Groq"
-        else:
-            return f"Error: Groq API returned status code {response.status_code}: {response.text}"
-            
+        # Pooled keep-alive client with retries and rate limiting
+        result = backend.invoke(content, parse_description)
+        return result.strip()
+    except GroqError as e:
+        return f"Error: {e}"
     except Exception as e:
         return f"Error connecting to Groq: {str(e)}"
+
+
+# --- Streaming: yield the answer as the model produces it ---
+def _streamed(backend, model_name, dom_content, parse_description, max_chars):
+    """Serve a cached answer at once, otherwise stream from the backend and cache the finished text"""
+    if not dom_content or not parse_description:
+        yield "No content to parse"
+        return
+
+    model_name = model_name or BACKEND_MODELS[backend][0]
+    key = response_key(backend, model_name, {
+        "dom_content": dom_content, "parse_description": parse_description, "max_chars": max_chars,
+    })
+    cache = get_response_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    try:
+        content = dom_content[:max_chars] if max_chars else dom_content
+        instance = get_backend(backend, model_name)
+        content = pack_content(content, instance.content_budget(parse_description))
+        with metrics.timer("llm_request_seconds", backend=backend, model=model_name):
+            for piece in instance.stream(content, parse_description):
+                pieces.append(piece)
+                yield piece
+        # Streams carry no usage block; count estimates
+        metrics.inc("llm_tokens_total", count_prompt_tokens(content, parse_description), backend=backend,
+                    kind="prompt")
+        metrics.inc("llm_tokens_total", estimate_tokens("".join(pieces)), backend=backend, kind="completion")
+    except Exception as e:
+        yield f"Error: {e}"
+        return
+
+    # Cache what the non-streaming parse function would return, under the same key
+    answer = finish_answer(backend, "".join(pieces))
+    if answer:
+        cache.set(key, answer)
+
+
+def stream_with_groq(dom_content, parse_description, max_chars=None, model=None):
+    """Generator version of parse_with_groq (Groq SSE ``stream: true``)"""
+    if not os.getenv("GROQ_API_KEY"):
+        yield "Error: GROQ_API_KEY not found. Please set your API key in environment variables or hardcode it in parse.py"
+        return
+    yield from _streamed("groq", model, dom_content, parse_description, max_chars)
+
+
+def stream_with_Ollama(dom_content, parse_description, max_chars=None, model=None):
+    """Generator version of perse_with_Ollama using ``OllamaLLM.stream``"""
+    yield from _streamed("ollama", model, dom_content, parse_description, max_chars)
+
+
+# --- Map-reduce parsing over every chunk of a page ---
+def reduce_answers(answers, parse_description, backend="groq", model=None):
+    """One answer combined by the model from merged partial answers; ``answers`` itself if that fails"""
+    model_name = model or BACKEND_MODELS[backend][0]
+    key = response_key(backend, model_name, {"answers": answers, "parse_description": parse_description,
+                                             "step": "reduce"})
+    instance = get_backend(backend, model_name)
+
+    def compute():
+        try:
+            packed = pack_content(answers, instance.content_budget(parse_description))
+            return finish_answer(backend, instance.reduce(packed, parse_description))
+        except Exception as e:
+            return f"Error: {e}"
+
+    result = get_response_cache().get_or_compute(
+        key, compute, cacheable=lambda result: isinstance(result, str) and not result.startswith("Error"))
+    return answers if result.startswith("Error") else result
+
+
+BACKENDS = {
+    "groq": parse_with_groq,
+    "ollama": perse_with_Ollama,
+}
+
+STREAMERS = {
+    "groq": stream_with_groq,
+    "ollama": stream_with_Ollama,
+}
+
+_TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+_LIST_MARKER = re.compile(r"^(?:[-*•+]|\d+[.)])\s+")
+
+
+def _normalize_answer_line(line):
+    return " ".join(_LIST_MARKER.sub("", line.strip().strip("|")).lower().split())
+
+
+def _is_useful(answer):
+    return bool(answer) and not answer.startswith("Error") and NO_MATCH not in answer and answer != "No content to parse"
+
+
+def merge_answers(answers):
+    """Concatenate partial answers, merging same-header tables and dropping repeated rows and list items"""
+    blocks = []   # ("table", header) or ("text", line), in order of first appearance
+    tables = {}   # header -> (separator, rows)
+    seen = set()
+
+    for answer in answers:
+        if not _is_useful(answer):
+            continue
+        lines = answer.strip().splitlines()
+        index = 0
+        while index < len(lines):
+            line = lines[index].strip()
+            is_header = (line.startswith("|") and index + 1 < len(lines)
+                         and _TABLE_SEPARATOR.match(lines[index + 1].strip()))
+            if is_header:
+                header = _normalize_answer_line(line)
+                if header not in tables:
+                    tables[header] = (line, lines[index + 1].strip(), [])
+                    blocks.append(("table", header))
+                index += 2
+                # Rows continue until the first non-table line
+                while index < len(lines) and lines[index].strip().startswith("|"):
+                    row = lines[index].strip()
+                    key = (header, _normalize_answer_line(row))
+                    if key not in seen:
+                        seen.add(key)
+                        tables[header][2].append(row)
+                    index += 1
+                continue
+
+            key = _normalize_answer_line(line)
+            if not key:
+                if blocks and blocks[-1] != ("text", ""):
+                    blocks.append(("text", ""))
+            elif key not in seen:
+                seen.add(key)
+                blocks.append(("text", line))
+            index += 1
+
+    output = []
+    for kind, value in blocks:
+        if kind == "table":
+            header_line, separator, rows = tables[value]
+            output.extend([header_line, separator] + rows)
+        else:
+            output.append(value)
+    return "\n".join(output).strip()
+
+
+def split_for_model(dom_content, parse_description, backend="groq", model=None, chunk_size=None):
+    """Chunks of at most ``chunk_size`` characters, or sized to the model's token budget when None"""
+    from scrape import split_dom_content
+
+    if chunk_size:
+        return split_dom_content(dom_content, max_length=chunk_size)
+    budget = get_backend(backend, model).content_budget(parse_description)
+    return split_dom_content(dom_content, max_length=budget, length_function=estimate_tokens)
+
+
+def relevant_content(dom_content, parse_description, backend="groq", model=None, top_k=None):
+    """Only the passages that match the query, within RETRIEVAL_TOKENS and one request's budget"""
+    budget = min(RETRIEVAL_TOKENS, get_backend(backend, model).content_budget(parse_description))
+    return select_relevant(dom_content, parse_description, budget, top_k=top_k)
+
+
+def parse_chunks(dom_content, parse_description, chunk_size=None, backend="groq",
+                 max_in_flight=4, reduce="merge", on_progress=None, model=None, retrieve=False, top_k=None):
+    """Parse every chunk of a page instead of only its first few KB.
+
+    The content is split into ``chunk_size``-character chunks, or into the
+    largest chunks the model's context fits when ``chunk_size`` is None.
+    The chunks are sent to the backend (``model`` or its default)
+    concurrently, at most ``max_in_flight`` at a time, and the partial
+    answers are merged locally (``reduce="merge"``) or handed to the model
+    once more to be combined (``reduce="llm"``). With ``retrieve`` only the
+    passages ranked most relevant to the query (at most ``top_k``) are sent.
+
+    ``on_progress(done, total)`` is called from the calling thread (safe for
+    Streamlit) each time a chunk finishes.
+
+    Returns a dict with ``result``, ``chunks``, ``processed`` (chunks that
+    produced an answer), ``failed``, estimated ``prompt_tokens`` and
+    ``elapsed`` seconds.
+    """
+    started = time.perf_counter()
+    parse = BACKENDS[backend]
+    if retrieve and parse_description:
+        dom_content = relevant_content(dom_content, parse_description, backend, model, top_k)
+    chunks = split_for_model(dom_content, parse_description, backend, model, chunk_size) if parse_description else []
+    if not chunks or not parse_description:
+        return {"result": "No content to parse", "chunks": 0, "processed": 0, "failed": 0,
+                "prompt_tokens": 0, "elapsed": 0.0}
+
+    answers = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(chunks)))) as executor:
+        futures = {
+            executor.submit(parse, chunk, parse_description, max_chars=None, model=model): index
+            for index, chunk in enumerate(chunks)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            answers[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, len(chunks))
+
+    errors = [answer for answer in answers if answer.startswith("Error")]
+    merged = merge_answers(answers)
+    if merged and reduce == "llm" and len(chunks) > 1:
+        merged = reduce_answers(merged, parse_description, backend, model)
+
+    if not merged:
+        # Every chunk failed: surface the first error rather than a false "no match"
+        merged = errors[0] if len(errors) == len(answers) else NO_MATCH
+
+    return {
+        "result": merged,
+        "chunks": len(chunks),
+        "processed": sum(1 for answer in answers if _is_useful(answer)),
+        "failed": len(errors),
+        "prompt_tokens": sum(count_prompt_tokens(chunk, parse_description) for chunk in chunks),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
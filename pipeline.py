@@ -0,0 +1,273 @@
+"""Asynchronous fetch -> clean -> parse pipeline with bounded queues between stages."""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+import http_fetch
+import metrics
+from dedup import Deduplicator
+from groq_client import BACKOFF_BASE, BACKOFF_CAP, DEFAULT_GROQ_BASE_URL, GROQ_RPM, GROQ_TPM, TokenBucket, \
+    RETRY_STATUSES, backoff_delay, estimate_request_tokens, retry_after_seconds
+from llm_cache import get_response_cache
+from retrieval import RETRIEVAL_TOKENS, select_relevant
+from parse import GROQ_MODEL, SYSTEM_PROMPT, TEMPERATURE, count_prompt_tokens, merge_answers, response_key, \
+    template
+from scrape import clean_html, scrape_website, split_dom_content
+from structured import answer_query, extract_structured
+
+_DONE = object()
+
+
+def _clean_worker(html, escalate, main_content=False, output="text", structured=False):
+    """Runs in a worker process: returns (reason to use a browser or None, cleaned text, structured data)"""
+    reason = http_fetch.needs_javascript(html)
+    if reason and escalate:
+        # Pages headed for the browser are cleaned after they are re-rendered
+        return reason, "", None
+    return reason, clean_html(html, main_content, output), (extract_structured(html) if structured else None)
+
+
+async def _run_stage(inbox, outbox, concurrency, handler, downstream_workers):
+    """Drain ``inbox`` with ``concurrency`` workers, then signal the next stage"""
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            if item["status"] == "ok":
+                try:
+                    await handler(item)
+                except Exception as e:
+                    item["status"] = "error"
+                    item["error"] = f"{type(e).__name__}: {e}"
+            await outbox.put(item)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    for _ in range(downstream_workers):
+        await outbox.put(_DONE)
+
+
+class Pipeline:
+    """Async pipeline over ``(url, query)`` jobs; iterate ``run(jobs)`` to receive results as they finish.
+
+    Each stage has its own concurrency and the bounded queues apply backpressure. The remaining
+    options match the CLI's (``main_content``, ``output``, ``retrieve``, ``structured``, ``dedup``).
+    """
+
+    def __init__(self, fetch_concurrency=8, clean_workers=None, parse_concurrency=4, llm_in_flight=4,
+                 queue_size=16, chunk_size=4000, escalate=True, use_cache=True, llm_base_url=None,
+                 api_key=None, model=GROQ_MODEL, rpm=GROQ_RPM, tpm=GROQ_TPM, max_retries=4, timeout=20,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP,
+                 retrieve=False, main_content=False, output="text", structured=True, dedup=False):
+        self.fetch_concurrency = fetch_concurrency
+        self.clean_workers = clean_workers or os.cpu_count() or 2
+        self.parse_concurrency = parse_concurrency
+        self.llm_in_flight = llm_in_flight
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.escalate = escalate
+        self.use_cache = use_cache
+        self.llm_base_url = (llm_base_url or os.getenv("GROQ_BASE_URL") or DEFAULT_GROQ_BASE_URL).rstrip("/")
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.retrieve = retrieve
+        self.main_content = main_content
+        self.output = output
+        self.structured = structured
+        self.dedup = dedup
+        self._deduplicator = None
+
+    async def run(self, jobs):
+        """Async generator of result dicts, in completion order"""
+        queues = [asyncio.Queue(self.queue_size) for _ in range(4)]
+        fetch_q, clean_q, parse_q, out_q = queues
+
+        self._loop = asyncio.get_running_loop()
+        self._llm_slots = asyncio.Semaphore(self.llm_in_flight)
+        self._requests_bucket = TokenBucket(self.rpm) if self.rpm else None
+        self._tokens_bucket = TokenBucket(self.tpm) if self.tpm else None
+        self._deduplicator = Deduplicator() if self.dedup else None
+
+        limits = httpx.Limits(max_connections=max(self.fetch_concurrency, self.llm_in_flight) * 2,
+                              max_keepalive_connections=max(self.fetch_concurrency, self.llm_in_flight))
+        fetch_client = httpx.AsyncClient(
+            headers=dict(http_fetch.get_session().headers), timeout=self.timeout,
+            follow_redirects=True, limits=limits,
+        )
+        llm_client = httpx.AsyncClient(
+            base_url=self.llm_base_url, timeout=self.timeout, limits=limits,
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+        )
+        # Cleaning is CPU-bound: run it in processes so it never holds the event loop's GIL
+        process_pool = ProcessPoolExecutor(max_workers=self.clean_workers)
+        self._fetch_client, self._llm_client, self._process_pool = fetch_client, llm_client, process_pool
+
+        async def feed():
+            for job in jobs:
+                url, query = job if isinstance(job, (tuple, list)) else (job, "")
+                await fetch_q.put({
+                    "url": url, "query": query, "status": "ok", "tier": None, "content": "",
+                    "result": None, "chunks": 0, "prompt_tokens": 0, "fetch_time": 0.0, "clean_time": 0.0,
+                    "parse_time": 0.0, "elapsed": 0.0, "error": None, "answered_by": None,
+                    "_started": time.perf_counter(),
+                })
+            for _ in range(self.fetch_concurrency):
+                await fetch_q.put(_DONE)
+
+        tasks = [
+            asyncio.ensure_future(feed()),
+            asyncio.ensure_future(_run_stage(fetch_q, clean_q, self.fetch_concurrency, self._fetch, self.clean_workers)),
+            asyncio.ensure_future(_run_stage(clean_q, parse_q, self.clean_workers, self._clean, self.parse_concurrency)),
+            asyncio.ensure_future(_run_stage(parse_q, out_q, self.parse_concurrency, self._parse, 1)),
+        ]
+        try:
+            while True:
+                item = await out_q.get()
+                if item is _DONE:
+                    break
+                item["elapsed"] = round(time.perf_counter() - item.pop("_started"), 3)
+                yield item
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await fetch_client.aclose()
+            await llm_client.aclose()
+            process_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _fetch(self, item):
+        started = time.perf_counter()
+        try:
+            with metrics.timer("page_load_seconds", tier="http"):
+                response = await self._fetch_client.get(item["url"])
+            metrics.inc("page_bytes_total", len(response.content), tier="http")
+            if response.status_code != 200 and not self.escalate:
+                raise RuntimeError(f"http status {response.status_code}")
+            item["html"] = response.text if response.status_code == 200 else ""
+        except httpx.HTTPError:
+            if not self.escalate:
+                raise
+            item["html"] = ""  # the clean stage escalates empty documents to the browser
+        item["tier"] = "http"
+        item["fetch_time"] = round(time.perf_counter() - started, 3)
+
+    async def _clean(self, item):
+        started = time.perf_counter()
+        html = item.pop("html", "")
+        reason, text, data = await self._loop.run_in_executor(
+            self._process_pool, _clean_worker, html, self.escalate, self.main_content, self.output, self.structured)
+        if reason and self.escalate:
+            # Rare path: render in the shared Chrome pool without blocking the loop
+            html = await asyncio.to_thread(scrape_website, item["url"], None, "browser", self.use_cache)
+            _, text, data = await self._loop.run_in_executor(
+                self._process_pool, _clean_worker, html, False, self.main_content, self.output, self.structured)
+            item["tier"] = "browser"
+        http_fetch.record_tier(item["url"], item["tier"], reason)
+        if self._deduplicator is not None:
+            # The page URL as source: several queries on one page do not wipe each other's text
+            text = await asyncio.to_thread(self._deduplicator.dedup, text, item["url"])
+        item["content"] = text
+        item["structured"] = data
+        item["clean_time"] = round(time.perf_counter() - started, 3)
+        # Worker processes keep their own registries, so the parent records the stage
+        metrics.observe("clean_seconds", time.perf_counter() - started, function="pipeline")
+        metrics.inc("cleaned_chars_total", len(text))
+
+    def dedup_stats(self):
+        """``Deduplicator.stats()`` of the current or last run, or None without ``dedup``"""
+        return self._deduplicator.stats() if self._deduplicator is not None else None
+
+    async def _parse(self, item):
+        data = item.pop("structured", None)
+        if not item["query"]:
+            return
+        started = time.perf_counter()
+        answer = answer_query(data, item["query"]) if data else None
+        if answer:
+            item["result"], item["answered_by"] = answer, "structured"
+            item["parse_time"] = round(time.perf_counter() - started, 3)
+            return
+        content = item["content"]
+        if self.retrieve:
+            content = select_relevant(content, item["query"], RETRIEVAL_TOKENS)
+        chunks = split_dom_content(content, max_length=self.chunk_size)
+        # Let every chunk finish; one that exhausted its retries becomes an error answer like the others
+        answers = await asyncio.gather(*(self._ask(chunk, item["query"]) for chunk in chunks), return_exceptions=True)
+        answers = [f"Error: {type(answer).__name__}: {answer}" if isinstance(answer, Exception) else answer
+                   for answer in answers]
+        item["chunks"] = len(chunks)
+        item["prompt_tokens"] = sum(count_prompt_tokens(chunk, item["query"]) for chunk in chunks)
+        errors = [answer for answer in answers if answer.startswith("Error")]
+        if errors and len(errors) == len(answers):
+            # Every chunk failed: surface the first error rather than a false "no match"
+            item["status"], item["error"], item["result"] = "error", errors[0], errors[0]
+        else:
+            item["result"] = merge_answers(answers) or "No matching information found"
+        item["answered_by"] = "llm"
+        item["parse_time"] = round(time.perf_counter() - started, 3)
+
+    async def _ask(self, chunk, query):
+        """One chat completion, sharing the sync parser's response cache"""
+        key = response_key("groq", self.model, {"dom_content": chunk, "parse_description": query, "max_chars": None})
+        cache = get_response_cache() if self.use_cache else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": template.format(dom_content=chunk, parse_description=query)},
+        ]
+        payload = {"model": self.model, "messages": messages, "temperature": TEMPERATURE}
+
+        async with self._llm_slots:
+            for attempt in range(self.max_retries + 1):
+                await self._throttle(estimate_request_tokens(messages))
+                try:
+                    with metrics.timer("llm_request_seconds", backend="groq", model=self.model):
+                        response = await self._llm_client.post("/chat/completions", json=payload)
+                except (httpx.ConnectError, httpx.TimeoutException):
+                    if attempt >= self.max_retries:
+                        raise
+                    metrics.inc("llm_retries_total", backend="groq")
+                    await asyncio.sleep(backoff_delay(attempt, None, self.backoff_base, self.backoff_cap))
+                    continue
+                if response.status_code == 200:
+                    body = response.json()
+                    usage = body.get("usage") or {}
+                    metrics.inc("llm_tokens_total", usage.get("prompt_tokens", 0), backend="groq", kind="prompt")
+                    metrics.inc("llm_tokens_total", usage.get("completion_tokens", 0), backend="groq",
+                                kind="completion")
+                    answer = body["choices"][0]["message"]["content"].strip()
+                    if cache is not None:
+                        cache.set(key, answer)
+                    return answer
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    metrics.inc("llm_retries_total", backend="groq")
+                    retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                    await asyncio.sleep(backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_cap))
+                    continue
+                return f"Error: Groq API returned status code {response.status_code}: {response.text}"
+
+    async def _throttle(self, token_estimate):
+        if self._requests_bucket:
+            await asyncio.to_thread(self._requests_bucket.acquire, 1)
+        if self._tokens_bucket:
+            await asyncio.to_thread(self._tokens_bucket.acquire, token_estimate)
+
+
+def run_pipeline(jobs, **options):
+    """Synchronous helper: run the pipeline to completion and return every result"""
+    async def collect():
+        return [item async for item in Pipeline(**options).run(jobs)]
+    return asyncio.run(collect())
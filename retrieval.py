@@ -0,0 +1,118 @@
+"""Local relevance filter: keep only the passages of a page that match the query, ranked with BM25."""
+import math
+import os
+import re
+from collections import Counter
+
+from tokens import estimate_tokens
+
+# Content tokens kept by default, and the passage size they are selected in
+RETRIEVAL_TOKENS = int(os.getenv("RETRIEVAL_TOKENS", "3000"))
+PASSAGE_TOKENS = int(os.getenv("RETRIEVAL_PASSAGE_TOKENS", "200"))
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_CJK_RUN = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+# Query words that say what to do rather than what to look for
+STOPWORDS = frozenset("""
+a about all an and any are as at be by can do does extract find for from get give has have how i in
+information is it its list me my of on or show tell that the their them there these this those to
+what when where which who with every each please details detail
+""".split())
+
+
+def _stem(word):
+    # Crude suffix stripping so "projects" matches "project" and "technologies" "technology"
+    if len(word) > 4:
+        if word.endswith("ies"):
+            return word[:-3] + "y"
+        for suffix in ("ing", "ed", "es", "s"):
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Lowercased, lightly stemmed terms; CJK runs become character bigrams"""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if _CJK_RUN.fullmatch(word):
+            terms.extend(word[i:i + 2] for i in range(max(1, len(word) - 1)))
+        elif word not in STOPWORDS:
+            terms.append(_stem(word))
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over a list of documents, backed by term -> [(doc, tf)] postings"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = []
+        for doc_id, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, frequency))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def idf(self, term):
+        matches = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.lengths) - matches + 0.5) / (matches + 0.5))
+
+    def scores(self, query):
+        """BM25 score of every document for ``query`` (only matching postings are visited)"""
+        scores = [0.0] * len(self.lengths)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.average_length or 1))
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+
+def select_passages(passages, query, budget_tokens, top_k=None, neighbors=1, length_function=estimate_tokens):
+    """Indexes of the passages to keep, in document order, or None when nothing matches"""
+    scores = BM25Index(passages).scores(query)
+    ranked = sorted((index for index, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+    if not ranked:
+        return None
+    if top_k:
+        ranked = ranked[:top_k]
+
+    chosen, used = set(), 0
+    for index in ranked:
+        for candidate in range(index, min(len(passages), index + 1 + neighbors)):
+            if candidate in chosen:
+                continue
+            cost = length_function(passages[candidate])
+            if used + cost > budget_tokens:
+                # Neighbors are optional; a hit that does not fit ends the selection
+                if candidate == index:
+                    return sorted(chosen) or [index]
+                break
+            chosen.add(candidate)
+            used += cost
+    return sorted(chosen)
+
+
+def select_relevant(content, query, budget_tokens=RETRIEVAL_TOKENS, top_k=None, passage_tokens=PASSAGE_TOKENS):
+    """The parts of ``content`` most relevant to ``query`` within ``budget_tokens``.
+
+    Content that already fits, or that shares no terms with the query, is
+    returned unchanged so the model still sees the whole page.
+    """
+    if not content or not query or estimate_tokens(content) <= budget_tokens:
+        return content
+    from scrape import split_dom_content
+
+    passages = split_dom_content(content, max_length=passage_tokens, length_function=estimate_tokens)
+    selected = select_passages(passages, query, budget_tokens, top_k=top_k)
+    if selected is None:
+        return content
+    return "\n".join(passages[index] for index in selected)
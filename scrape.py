@@ -1,147 +1,488 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
+# Selenium and bs4 are imported where they are used: most pages never need a browser
+from driver_pool import get_default_pool
+import boilerplate
+import dom_markdown
+import http_fetch
+import html_cache
+import metrics
+from singleflight import get_default_flight
+from url_utils import normalize_url
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
 import time
 import re
 
-def scrape_website(website):
-    print("Launching Chrome Browser...")
-    
-    options = webdriver.ChromeOptions()
-    
-    # Speed optimizations
-    options.add_argument('--headless=new')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-extensions')
-    options.add_argument('--disable-plugins')
-    options.add_argument('--disable-images')
-    options.add_argument('--disable-javascript')
-    options.add_argument('--disable-css')
-    options.add_argument('--disable-background-timer-throttling')
-    options.add_argument('--disable-backgrounding-occluded-windows')
-    options.add_argument('--disable-renderer-backgrounding')
-    options.add_argument('--disable-features=TranslateUI')
-    options.add_argument('--disable-ipc-flooding-protection')
-    options.add_argument('--memory-pressure-off')
-    options.add_argument('--max_old_space_size=4096')
-    
-    # Fastest page load strategy
-    options.page_load_strategy = 'eager'
-    
-    # Check for system installed chromium (common in cloud environments)
-    import shutil
-    chrome_binary = shutil.which("chromium") or shutil.which("google-chrome")
-    chrome_driver_binary = shutil.which("chromedriver")
+def scrape_website(website, pool=None, mode="auto", use_cache=True):
+    """Fetch a page, trying plain HTTP before falling back to headless Chrome.
 
-    if chrome_binary:
-        options.binary_location = chrome_binary
+    ``mode`` is "auto" (HTTP first, browser only when the page needs JS),
+    "http" (never launch a browser) or "browser" (always use Chrome).
+    Pages are served from the shared on-disk HTML cache when ``use_cache``
+    is set and SCRAPER_CACHE_DIR is configured. Concurrent scrapes of the
+    same URL share one fetch (see ``singleflight``); across processes only
+    when the cache is on, since waiters then find the page in it. A cached
+    page fetched over HTTP that needed JavaScript only serves ``mode="http"``.
+    """
+    metrics.inc("scrapes_total")
+    cache = html_cache.get_default_cache() if use_cache else None
 
-    # Use system chromedriver if available (matches package version), else use webdriver-manager
-    from selenium.webdriver.chrome.service import Service as ChromeService
-    
-    if chrome_driver_binary:
-         service = ChromeService(executable_path=chrome_driver_binary)
-    else:
-        from webdriver_manager.chrome import ChromeDriverManager
-        service = ChromeService(ChromeDriverManager().install())
+    def fetch():
+        if cache is None:
+            return _fetch_page(website, pool, mode)["html"]
+        return cache.fetch(website, lambda validators: _fetch_page(website, pool, mode, validators),
+                           accept=lambda entry: _cache_accepts(entry, mode))
 
-    driver = webdriver.Chrome(service=service, options=options)
-    
-    # Set timeouts for faster failure
-    driver.set_page_load_timeout(8)
-    driver.implicitly_wait(2)
+    key = f"scrape:{mode}:{int(cache is not None)}:{normalize_url(website)}"
+    return get_default_flight().do(key, fetch, cross_process=cache is not None)
+
+
+def _cache_accepts(entry, mode):
+    """Whether a cached page is what a fetch in ``mode`` would return"""
+    if mode == "http":
+        return True
+    if mode == "browser":
+        return entry.get("tier") == "browser"
+    return entry.get("tier") == "browser" or (entry.get("tier") == "http" and not entry.get("reason"))
+
+
+def _fetch_page(website, pool=None, mode="auto", validators=None):
+    """Uncached fetch; returns html plus the validators needed for revalidation"""
+    reason = None
+    if mode in ("auto", "http"):
+        result, reason = _fetch_over_http(website, validators)
+        if reason is None or mode == "http":
+            http_fetch.record_tier(website, "http", reason)
+            return dict(result, tier="http", reason=reason)
+
+    html = _scrape_with_browser(website, pool)
+    http_fetch.record_tier(website, "browser", reason)
+    return {"html": html, "etag": None, "last_modified": None, "not_modified": False,
+            "tier": "browser", "reason": reason}
+
+
+def _fetch_over_http(website, validators=None):
+    """Fast tier: returns (result, reason to escalate or None)"""
+    result = {"html": "", "etag": None, "last_modified": None, "not_modified": False}
+
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
 
+    try:
+        with metrics.timer("page_load_seconds", tier="http"):
+            response = http_fetch.fetch(website, headers=headers or None)
+    except Exception as e:
+        return result, f"http error: {e}"
+    metrics.inc("page_bytes_total", len(response.content), tier="http")
+
+    if response.status_code == 304 and validators:
+        result["not_modified"] = True
+        return result, None
+    if response.status_code != 200:
+        return result, f"http status {response.status_code}"
+    content_type = response.headers.get("Content-Type", "")
+    if content_type and "html" not in content_type.lower():
+        return result, f"non-html content ({content_type})"
+
+    result["html"] = response.text
+    result["etag"] = response.headers.get("ETag")
+    result["last_modified"] = response.headers.get("Last-Modified")
+    return result, http_fetch.needs_javascript(result["html"])
+
+
+def _scrape_with_browser(website, pool=None):
+    """Browser tier: render the page in a leased driver from the shared pool"""
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
 
-    try:
-        driver.get(website)
-        print("Page Loading..")
-        
-        # Remove fixed sleep, just wait for body
+    pool = pool or get_default_pool()
+
+    with pool.lease() as driver:
         try:
-            WebDriverWait(driver, 4).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-        except:
-            pass
-            
-        html = driver.page_source
-        return html
+            with metrics.timer("page_load_seconds", tier="browser"):
+                driver.get(website)
+
+                # Remove fixed sleep, just wait for body
+                try:
+                    WebDriverWait(driver, 4).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "body"))
+                    )
+                except:
+                    pass
+
+                html = driver.page_source
+            metrics.inc("page_bytes_total", len(html), tier="browser")
+            return html
+        except Exception:
+            # Already counted as errors_total{stage="page_load"} by the timer
+            return ""
+
+
+def _scrape_one(url, fetch, clean):
+    """Fetch and clean a single URL inside a worker thread"""
+    started = time.perf_counter()
+    result = {"url": url, "status": "ok", "html": "", "content": "",
+              "fetch_time": 0.0, "elapsed": 0.0, "error": None}
+    try:
+        html = fetch(url)
+        result["fetch_time"] = round(time.perf_counter() - started, 3)
+        result["html"] = html or ""
+        if not html:
+            result["status"] = "empty"
+        elif clean:
+            # Clean in the worker so the consumer never becomes a serial bottleneck
+            result["content"] = (clean if callable(clean) else clean_html)(html)
     except Exception as e:
-        print("Error while scraping:", e)
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["elapsed"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def scrape_many(urls, max_concurrency=4, per_host_limit=2, fetch=None, clean=True):
+    """Scrape several URLs in parallel, yielding result dicts as they finish.
+
+    At most ``max_concurrency`` fetches run at once and at most
+    ``per_host_limit`` of them target the same host, so one slow domain
+    cannot occupy every worker. Each result carries ``status`` ("ok",
+    "empty" or "error"), timings in seconds and the error message if any.
+    ``clean`` may also be a callable used instead of ``clean_html``.
+    """
+    fetch = fetch or scrape_website
+    per_host_limit = max(1, per_host_limit)
+
+    pending = {}
+    for url in urls:
+        host = urlsplit(url).netloc.lower()
+        pending.setdefault(host, deque()).append(url)
+
+    active = defaultdict(int)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        while pending or running:
+            # Hand out free slots round-robin across hosts that are under their limit
+            submitted = True
+            while submitted and len(running) < max_concurrency:
+                submitted = False
+                for host in list(pending):
+                    if len(running) >= max_concurrency:
+                        break
+                    if active[host] >= per_host_limit:
+                        continue
+                    url = pending[host].popleft()
+                    if not pending[host]:
+                        del pending[host]
+                    running[executor.submit(_scrape_one, url, fetch, clean)] = host
+                    active[host] += 1
+                    submitted = True
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                active[running.pop(future)] -= 1
+                yield future.result()
+
+
+# Elements whose text never belongs in the LLM input
+EXTRACT_TAGS = ("script", "style", "noscript", "iframe", "embed", "object")
+UNWANTED_TAGS = EXTRACT_TAGS + ("form", "svg")
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8", huge_tree=True)
+
+
+def _parse_html(html_content):
+    """Parse markup with lxml; returns the document root or None for empty input"""
+    if isinstance(html_content, str):
+        # lxml refuses str input with an XML encoding declaration, bytes are always accepted
+        html_content = html_content.encode("utf-8")
+    try:
+        return lxml.html.document_fromstring(html_content, parser=_HTML_PARSER)
+    except etree.ParserError:
+        return None
+
+
+def _normalize_lines(text):
+    """Strip each line and split on runs of double spaces, dropping empties"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return (chunk for chunk in chunks if chunk)
+
+
+def clean_html(html_content, main_content=False, output="text"):
+    """Single-pass cleaner: raw HTML in, normalized visible body text out.
+
+    Produces the same text as ``clean_body_content(extract_body_content(html))``
+    with one lxml parse and no intermediate serialization. With
+    ``main_content`` navigation, banners, footers and sidebars are dropped
+    too (see ``boilerplate.extract_main``). ``output="markdown"`` keeps
+    headings, lists and table rows (see ``dom_markdown.render_markdown``).
+    """
+    with metrics.timer("clean_seconds", function="clean_html", output=output):
+        text = _clean_html(html_content, main_content, output)
+    metrics.inc("cleaned_chars_total", len(text))
+    return text
+
+
+def _clean_html(html_content, main_content, output):
+    if not html_content:
+        return ""
+
+    root = _parse_html(html_content)
+    if root is None:
         return ""
-    finally:
-        driver.quit()
+
+    # The old two-step path re-serialized after dropping EXTRACT_TAGS, which
+    # merged the text around them; form/svg/comments only split text nodes
+    etree.strip_elements(root, *EXTRACT_TAGS, with_tail=False)
+    for element in list(root.iter(etree.Comment, etree.ProcessingInstruction, "form", "svg")):
+        element.clear(keep_tail=True)
+    body = root.find("body")
+    if body is None:
+        body = root
+    if main_content:
+        body = boilerplate.extract_main(body)
+    if output == "markdown":
+        return dom_markdown.render_markdown(body)
+
+    # Same text nodes, in the same order, that BeautifulSoup's get_text would yield
+    text = "\n".join(body.itertext())
+    return "\n".join(_normalize_lines(text))
+
+
+class _TextTarget:
+    """lxml parser target collecting normalized body text while skipping unwanted subtrees"""
+
+    SKIP_TAGS = frozenset(UNWANTED_TAGS)
+
+    def __init__(self):
+        self.lines = []
+        self.saw_body = False
+        self._buffer = []
+        self._depth = 0
+        self._skip_depth = None
+
+    def start(self, tag, attrib):
+        self._depth += 1
+        if self._skip_depth is not None:
+            return
+        # Text around EXTRACT_TAGS is merged, as in clean_html
+        if tag not in EXTRACT_TAGS:
+            self._flush()
+        if tag == "body" and not self.saw_body:
+            # Like clean_html, read <head> only for documents without a <body>
+            self.saw_body = True
+            self.lines.clear()
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = self._depth
+
+    def end(self, tag):
+        if self._skip_depth == self._depth:
+            self._skip_depth = None
+            if tag not in EXTRACT_TAGS:
+                self._flush()
+        elif self._skip_depth is None:
+            self._flush()
+        self._depth -= 1
+
+    def data(self, text):
+        if self._skip_depth is None:
+            self._buffer.append(text)
+
+    def comment(self, text):
+        # Comments separate text nodes just like elements do
+        if self._skip_depth is None:
+            self._flush()
+
+    def pi(self, target, data=None):
+        if self._skip_depth is None:
+            self._flush()
+
+    def close(self):
+        self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self.lines.extend(_normalize_lines("".join(self._buffer)))
+            self._buffer.clear()
+
+
+def iter_clean_lines(html_content, feed_size=64 * 1024):
+    """Stream the lines ``clean_html`` would return without building a tree.
+
+    ``html_content`` may be a string or an iterable of str/bytes pieces (for
+    example ``response.iter_content()``). Unwanted subtrees are skipped as
+    they are parsed, and lines are yielded after every fed piece, so neither
+    the DOM nor the full text is ever held in memory.
+    """
+    if not html_content:
+        return
+
+    if isinstance(html_content, (str, bytes)):
+        pieces = (html_content[i:i + feed_size] for i in range(0, len(html_content), feed_size))
+    else:
+        pieces = html_content
+
+    target = _TextTarget()
+    parser = etree.HTMLParser(target=target, encoding="utf-8", huge_tree=True)
+    for piece in pieces:
+        parser.feed(piece.encode("utf-8") if isinstance(piece, str) else piece)
+        if target.lines and target.saw_body:
+            ready, target.lines = target.lines, []
+            yield from ready
+
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # Raised for documents without any element; whatever was collected still counts
+        pass
+    yield from target.lines
 
 
 def extract_body_content(html_content):
-    """Extract body with better structure preservation"""
+    """Extract body with better structure preservation.
+
+    Kept for compatibility; new code should call ``clean_html`` directly.
+    """
     if not html_content:
         return ""
     
-    soup = BeautifulSoup(html_content, "html.parser")
-    
-    # Remove only truly unnecessary elements
-    for element in soup(["script", "style", "noscript", "iframe", "embed", "object"]):
-        element.extract()
-    
-    # Keep body or main content
-    body_content = soup.body
-    if body_content:
-        return str(body_content)
-    else:
-        # If no body, return the whole HTML
-        return str(soup)
+    from bs4 import BeautifulSoup
+    with metrics.timer("clean_seconds", function="extract_body_content"):
+        soup = BeautifulSoup(html_content, "html.parser")
+
+        # Remove only truly unnecessary elements
+        for element in soup(["script", "style", "noscript", "iframe", "embed", "object"]):
+            element.extract()
+
+        # Keep body or main content
+        body_content = soup.body
+        if body_content:
+            return str(body_content)
+        else:
+            # If no body, return the whole HTML
+            return str(soup)
 
 
 def clean_body_content(body_content):
-    """Clean content and output structured text for perfect LLM extraction"""
-    if not body_content:
-        return ""
-    
-    soup = BeautifulSoup(body_content, "html.parser")
-    for element in soup(["script", "style", "noscript", "iframe", "embed", "object", "form", "svg"]):
-        element.extract()
+    """Clean content and output structured text for perfect LLM extraction.
 
-    # Get text with separator
-    text = soup.get_text(separator="\n")
-    
-    # Clean up whitespace
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = '\n'.join(chunk for chunk in chunks if chunk)
-    
-    return text
+    Compatibility shim over ``clean_html``, which accepts either the raw page
+    or the output of ``extract_body_content``.
+    """
+    return clean_html(body_content)
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;。！？])\s+")
+
+
+def _pack(pieces, joiner, max_length, length_function):
+    """Greedily join pieces with ``joiner`` into runs no longer than max_length"""
+    joiner_length = length_function(joiner) if joiner else 0
+    run, run_length = [], 0
+    for piece in pieces:
+        piece_length = length_function(piece)
+        added = piece_length + (joiner_length if run else 0)
+        if run and run_length + added > max_length:
+            yield joiner.join(run)
+            run, run_length, added = [], 0, piece_length
+        run.append(piece)
+        run_length += added
+    if run:
+        yield joiner.join(run)
+
+
+def _split_long_line(line, max_length, length_function=len):
+    """Break a single overlong line at sentence, then word, then character boundaries"""
+    for sentence in _pack(_SENTENCE_END.split(line), " ", max_length, length_function):
+        if length_function(sentence) <= max_length:
+            yield sentence
+            continue
+        for words in _pack(sentence.split(), " ", max_length, length_function):
+            if length_function(words) <= max_length:
+                yield words
+                continue
+            # A single "word" (URL, base64 blob...) still too long: cut it
+            step = max(1, int(max_length * len(words) / max(1, length_function(words))))
+            start = 0
+            while start < len(words):
+                piece = words[start:start + step]
+                while len(piece) > 1 and length_function(piece) > max_length:
+                    piece = piece[:len(piece) // 2]
+                yield piece
+                start += len(piece)
+
+
+def iter_dom_chunks(lines, max_length=4000, overlap=0, length_function=len):
+    """Linear-time chunker over an iterable of lines.
+
+    Lengths are measured with ``length_function`` (``len`` for characters,
+    or a token counter for token budgets) and tracked as running totals, so
+    no chunk is ever re-measured. Lines longer than ``max_length`` are
+    hard-split, and each new chunk repeats up to ``overlap`` units of
+    trailing lines from the previous one.
+    """
+    separator_length = length_function("\n")
+    current, lengths, current_length = [], [], 0
+
+    for line in lines:
+        line_length = length_function(line)
+        if line_length <= max_length:
+            pieces = ((line, line_length),)
+        else:
+            pieces = [(piece, length_function(piece)) for piece in _split_long_line(line, max_length, length_function)]
+
+        for piece, piece_length in pieces:
+            added = piece_length + (separator_length if current else 0)
+
+            if current and current_length + added > max_length:
+                chunk = "\n".join(current).strip()
+                if chunk:
+                    yield chunk
+
+                # Carry trailing lines into the next chunk, within the overlap budget
+                keep, kept_length = 0, 0
+                while overlap and keep < len(current):
+                    extra = lengths[-1 - keep] + (separator_length if keep else 0)
+                    if kept_length + extra > overlap or kept_length + extra + separator_length + piece_length > max_length:
+                        break
+                    kept_length += extra
+                    keep += 1
+                current = current[len(current) - keep:]
+                lengths = lengths[len(lengths) - keep:]
+                current_length = kept_length
+                added = piece_length + (separator_length if current else 0)
+
+            current.append(piece)
+            lengths.append(piece_length)
+            current_length += added
+
+    chunk = "\n".join(current).strip()
+    if chunk:
+        yield chunk
 
 
-def split_dom_content(dom_content, max_length=4000):
-    """Smart content splitting that preserves structure"""
+def split_dom_content(dom_content, max_length=4000, overlap=0, length_function=len):
+    """Smart content splitting that preserves structure.
+
+    Accepts the cleaned text or any iterable of lines, such as the
+    generator returned by ``iter_clean_lines``. See ``iter_dom_chunks``
+    for ``overlap`` and ``length_function``.
+    """
     if not dom_content:
         return []
     
-    if len(dom_content) <= max_length:
-        return [dom_content]
-    
-    # Split by paragraphs or sections to preserve structure
-    chunks = []
-    current_chunk = ""
-    
-    lines = dom_content.split('\n')
-    
-    for line in lines:
-        # If adding this line would exceed max_length, start new chunk
-        if len(current_chunk + line) > max_length and current_chunk:
-            chunks.append(current_chunk.strip())
-            current_chunk = line + '\n'
+    with metrics.timer("chunk_seconds"):
+        if isinstance(dom_content, str) and length_function(dom_content) <= max_length:
+            chunks = [dom_content]
         else:
-            current_chunk += line + '\n'
-    
-    # Add the last chunk
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
-    
-    return chunks if chunks else [dom_content]
\ No newline at end of file
+            lines = dom_content.split('\n') if isinstance(dom_content, str) else dom_content
+            chunks = list(iter_dom_chunks(lines, max_length, overlap, length_function))
+    metrics.inc("chunks_total", len(chunks))
+    return chunks
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+
+import metrics
+from fs_utils import file_lock
+
+# Shared directory for cross-process lock files; empty keeps coalescing within one process
+SINGLEFLIGHT_DIR = os.getenv("SINGLEFLIGHT_DIR", "")
+# Keys share this many lock files, so the directory stays the same size however many keys a job uses.
+# Two keys on one stripe only run one after the other across processes.
+LOCK_STRIPES = 256
+
+
+class _Call:
+    """One in-flight execution and the result every waiter receives"""
+
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller of ``do(key, func)`` runs ``func``; threads that ask
+    for the same key while it runs wait and receive its result (or its
+    exception). With a ``directory``, the leader also holds the lock file
+    of the key's stripe, so leaders in other processes wait for it. They
+    then run ``func`` themselves, which is only worthwhile when ``func``
+    starts by consulting a store shared between processes (the on-disk HTML
+    or LLM cache), so callers opt in per call with ``cross_process``.
+    """
+
+    def __init__(self, directory=SINGLEFLIGHT_DIR):
+        self.directory = directory or None
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"executions": 0, "coalesced": 0, "lock_waits": 0}
+        self._held = threading.local()  # stripes this thread holds, so a nested call cannot wait on itself
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def do(self, key, func, cross_process=True):
+        """Result of ``func()``, shared with every concurrent caller using ``key``"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters["executions"] += 1
+            else:
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+        metrics.inc("singleflight_calls_total", result="executed" if leader else "coalesced")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.directory and cross_process:
+                call.result = self._run_locked(key, func)
+            else:
+                call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_locked(self, key, func):
+        stripe = int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:4], "big") % LOCK_STRIPES
+        held = self._held.__dict__.setdefault("stripes", set())
+        if stripe in held:
+            return func()
+        with file_lock(os.path.join(self.directory, f"{stripe:03d}.lock")) as waited:
+            if waited:
+                with self._lock:
+                    self._counters["lock_waits"] += 1
+            held.add(stripe)
+            try:
+                return func()
+            finally:
+                held.discard(stripe)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+_default_flight = None
+_default_flight_lock = threading.Lock()
+
+
+def get_default_flight():
+    """Process-wide coalescer shared by scrapes and parses, configured from SINGLEFLIGHT_DIR"""
+    global _default_flight
+    with _default_flight_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
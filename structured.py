@@ -0,0 +1,342 @@
+"""Answer queries from JSON-LD, microdata, meta tags and tables without an LLM call when they clearly match."""
+import json
+import re
+import threading
+from collections import Counter
+
+import lxml.html
+from lxml import etree
+
+import metrics
+from retrieval import tokenize
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# A table answers a query when its title and headers cover this share of the query terms
+MIN_TABLE_COVERAGE = 0.6
+
+_PRODUCT_QUERY = re.compile(r"\b(?:products?|prices?|pricing|priced|costs?|offers?|skus?)\b", re.IGNORECASE)
+# Comparisons, filters and arithmetic need reasoning over the data: leave them to the LLM
+_NARROWING_QUERY = re.compile(
+    r"\d|\b(?:cheapest|cheaper|expensive|most|least|best|worst|under|over|below|above|less|more|than|"
+    r"between|only|except|compare|average|total|sum|count|how many|top|why|explain|summari[sz]e)\b",
+    re.IGNORECASE,
+)
+# Query words that ask for page metadata, and words that only say which page or tense
+_META_TERMS = {"title": "Title", "headline": "Title", "description": "Description",
+               "publish": "Published", "publication": "Published", "date": "Published",
+               "author": "Author", "wrote": "Author", "written": "Author", "writer": "Author"}
+_PAGE_TERMS = frozenset(("page", "article", "post", "story", "site", "website", "was", "were"))
+# A query made only of these words asks for the people listed on the page
+_PEOPLE_TERMS = frozenset(tokenize(
+    "people person team staff employee employees founder founders leadership executive executives speaker "
+    "speakers member members name names role roles job title titles position positions"
+))
+# Words that say what to do with a table rather than what it holds
+_TABLE_GENERIC_TERMS = frozenset(tokenize("table tables data rows columns return fetch"))
+# The product table has names and prices only: other query words (stock, reviews, features) need the LLM
+_PRODUCT_TERMS = frozenset(tokenize(
+    "product products item items offer offers sku skus name names price prices pricing priced cost costs "
+    "catalog catalogue"
+)) | _TABLE_GENERIC_TERMS | _PAGE_TERMS
+
+_CURRENCY_SYMBOLS = {"USD": "$", "EUR": "\u20ac", "GBP": "\u00a3", "JPY": "\u00a5", "INR": "\u20b9"}
+_CREDIT_KEYS = ("author", "creator", "editor", "publisher")
+_ARTICLE_TYPES = ("Article", "NewsArticle", "BlogPosting", "WebPage", "Report")
+
+_WHITESPACE = re.compile(r"\s+")
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8", huge_tree=True)
+
+_stats_lock = threading.Lock()
+_hits = Counter()
+_misses = 0
+
+
+def _text(value):
+    return _WHITESPACE.sub(" ", value or "").strip()
+
+
+def _types(entity):
+    """Bare schema.org type names of a JSON-LD/microdata entity ("Product", ...)"""
+    types = entity.get("@type") or []
+    if isinstance(types, str):
+        types = [types]
+    return {re.split(r"[/:#]", str(name))[-1] for name in types}
+
+
+def _collect_entities(node, out):
+    """Every typed object in a JSON-LD document, including nested ones and @graph members"""
+    if isinstance(node, list):
+        for item in node:
+            _collect_entities(item, out)
+    elif isinstance(node, dict):
+        if "@type" in node:
+            out.append(node)
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                _collect_entities(value, out)
+
+
+def _microdata_value(element):
+    if element.get("itemscope") is not None:
+        return _microdata_item(element)
+    tag = element.tag
+    if tag == "meta":
+        return element.get("content", "")
+    if tag in ("a", "link", "area"):
+        return element.get("href", "")
+    if tag in ("img", "audio", "video", "source", "embed", "iframe"):
+        return element.get("src", "")
+    if tag == "time" and element.get("datetime"):
+        return element.get("datetime")
+    if element.get("content") is not None:
+        return element.get("content")
+    if tag in ("data", "meter") and element.get("value") is not None:
+        return element.get("value")
+    return _text(element.text_content())
+
+
+def _microdata_item(scope):
+    """One itemscope as a JSON-LD shaped dict; nested scopes own their own properties"""
+    item = {"@type": scope.get("itemtype", "").split()}
+    stack = list(scope)
+    while stack:
+        element = stack.pop()
+        if not isinstance(element.tag, str):
+            continue
+        for name in (element.get("itemprop") or "").split():
+            value = _microdata_value(element)
+            if name in item:
+                existing = item[name]
+                item[name] = (existing if isinstance(existing, list) else [existing]) + [value]
+            else:
+                item[name] = value
+        if element.get("itemscope") is None:
+            stack.extend(element)
+    for name, value in item.items():
+        if isinstance(value, list) and name != "@type":
+            value.reverse()  # the stack walked the document backwards
+    return item
+
+
+def _table_title(table):
+    """Caption, or the nearest heading before the table"""
+    caption = table.find("caption")
+    if caption is not None:
+        return _text(caption.text_content())
+    element = table
+    for _ in range(4):
+        for sibling in element.itersiblings(preceding=True):
+            if not isinstance(sibling.tag, str):
+                continue
+            if sibling.tag in HEADING_TAGS:
+                return _text(sibling.text_content())
+            headings = list(sibling.iter(*HEADING_TAGS))
+            if headings:
+                return _text(headings[-1].text_content())
+        element = element.getparent()
+        if element is None or element.tag == "body":
+            break
+    return ""
+
+
+def _extract_table(table):
+    rows, header = [], []
+    for row in table.iter("tr"):
+        cells = [cell for cell in row if cell.tag in ("td", "th")]
+        values = [_text(cell.text_content()).replace("|", "\\|") for cell in cells]
+        if not any(values):
+            continue
+        if not rows and not header and all(cell.tag == "th" for cell in cells):
+            header = values
+        else:
+            rows.append(values)
+    width = max([len(header)] + [len(row) for row in rows])
+    if width < 2 or not rows:
+        return None  # single-column and empty tables are layout, not data
+    return {"title": _table_title(table), "header": header, "rows": rows}
+
+
+def extract_structured(html):
+    """{"json_ld", "microdata", "meta", "tables"} found in the raw HTML of a page"""
+    data = {"json_ld": [], "microdata": [], "meta": {}, "tables": []}
+    if not html:
+        return data
+    try:
+        root = lxml.html.document_fromstring(html.encode("utf-8") if isinstance(html, str) else html,
+                                             parser=_HTML_PARSER)
+    except etree.ParserError:
+        return data
+
+    for script in root.iter("script"):
+        if (script.get("type") or "").strip().lower() != "application/ld+json":
+            continue
+        try:
+            _collect_entities(json.loads(script.text or ""), data["json_ld"])
+        except ValueError:
+            continue  # broken JSON-LD is common; skip it rather than fail the page
+
+    for scope in root.xpath("//*[@itemscope and not(@itemprop)]"):
+        data["microdata"].append(_microdata_item(scope))
+
+    title = root.find(".//title")
+    if title is not None and _text(title.text_content()):
+        data["meta"]["title"] = _text(title.text_content())
+    for meta in root.iter("meta"):
+        name = (meta.get("property") or meta.get("name") or "").strip().lower()
+        if name and meta.get("content") and name not in data["meta"]:
+            data["meta"][name] = _text(meta.get("content"))
+
+    for table in root.iter("table"):
+        if table.find(".//table") is None:
+            extracted = _extract_table(table)
+            if extracted:
+                data["tables"].append(extracted)
+    return data
+
+
+def _first(value):
+    while isinstance(value, list):
+        value = value[0] if value else ""
+    return value
+
+
+def _name(value):
+    value = _first(value)
+    return _text(str(value.get("name", "")) if isinstance(value, dict) else str(value or ""))
+
+
+def _price(product):
+    offer = _first(product.get("offers"))
+    if not isinstance(offer, dict):
+        return ""
+    currency = _name(offer.get("priceCurrency"))
+    symbol = _CURRENCY_SYMBOLS.get(currency)
+    low, high, price = _name(offer.get("lowPrice")), _name(offer.get("highPrice")), _name(offer.get("price"))
+    amount = f"{low}-{high}" if low and high and low != high else price or low
+    if not amount:
+        return ""
+    return f"{symbol}{amount}" if symbol and not amount.startswith(symbol) else f"{amount} {currency}".strip()
+
+
+def _markdown_table(header, rows):
+    width = max([len(header)] + [len(row) for row in rows])
+    header = header or [""] * width
+    lines = ["| " + " | ".join(header + [""] * (width - len(header))) + " |", "|" + "---|" * width]
+    lines.extend("| " + " | ".join(row + [""] * (width - len(row))) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+def _of_type(data, names):
+    """Entities of the given types, JSON-LD first; returns (source, entities)"""
+    for source, key in (("json-ld", "json_ld"), ("microdata", "microdata")):
+        entities = [entity for entity in data[key] if _types(entity) & names and _name(entity.get("name"))]
+        if entities:
+            return source, entities
+    return None, []
+
+
+def _answer_products(data):
+    source, products = _of_type(data, {"Product", "IndividualProduct", "ProductModel", "Vehicle", "Book"})
+    rows = {}
+    for product in products:
+        rows.setdefault(_name(product.get("name")), _price(product))
+    if not rows or not any(rows.values()):
+        return None, None
+    return _markdown_table(["Product", "Price"], [[name, price] for name, price in rows.items()]), source
+
+
+def _answer_people(data):
+    source, people = _of_type(data, {"Person"})
+    # Authors and editors belong to the page's metadata, not to the people it lists
+    credited = {id(_first(entity.get(key))) for entity in data["json_ld"] for key in _CREDIT_KEYS}
+    rows = {}
+    for person in people:
+        if id(person) in credited:
+            continue
+        rows.setdefault(_name(person.get("name")), [_name(person.get("jobTitle")), _name(person.get("worksFor"))])
+    if not rows:
+        return None, None
+    header = ["Name", "Job title", "Organization"]
+    keep = [0] + [column for column in (1, 2) if any(values[column - 1] for values in rows.values())]
+    table = [[name] + values for name, values in rows.items()]
+    return _markdown_table([header[i] for i in keep], [[row[i] for i in keep] for row in table]), source
+
+
+def _answer_meta(data, terms):
+    article = next((entity for entity in data["json_ld"] if _types(entity) & set(_ARTICLE_TYPES)), {})
+    meta = data["meta"]
+    values = {
+        "Title": _name(article.get("headline")) or meta.get("og:title") or meta.get("title", ""),
+        "Description": _name(article.get("description")) or meta.get("og:description") or meta.get("description", ""),
+        "Published": _name(article.get("datePublished")) or meta.get("article:published_time", ""),
+        "Author": _name(article.get("author")) or meta.get("author", ""),
+    }
+    lines = []
+    for label in dict.fromkeys(_META_TERMS[term] for term in terms):
+        if not values[label]:
+            return None, None
+        lines.append(f"{label}: {values[label]}")
+    return "\n".join(lines), ("json-ld" if article else "meta")
+
+
+def _answer_table(data, terms):
+    terms = [term for term in terms if term not in _TABLE_GENERIC_TERMS]
+    if not terms:
+        return None, None
+    best, best_coverage = None, 0.0
+    for table in data["tables"]:
+        vocabulary = set(tokenize(" ".join([table["title"]] + table["header"])))
+        coverage = sum(1 for term in terms if term in vocabulary) / len(terms)
+        if coverage > best_coverage:
+            best, best_coverage = table, coverage
+    if best is None or best_coverage < MIN_TABLE_COVERAGE:
+        return None, None
+    answer = _markdown_table(best["header"], best["rows"])
+    return (f"{best['title']}\n\n{answer}" if best["title"] else answer), "table"
+
+
+def answer_from_data(data, query):
+    """(answer, source) when the structured data answers the query, else (None, None)"""
+    if not data or not query or _NARROWING_QUERY.search(query):
+        return None, None
+    terms = tokenize(query)
+    if terms and all(term in _META_TERMS or term in _PAGE_TERMS for term in terms) \
+            and any(term in _META_TERMS for term in terms):
+        return _answer_meta(data, [term for term in terms if term in _META_TERMS])
+    if _PRODUCT_QUERY.search(query) and all(term in _PRODUCT_TERMS for term in terms):
+        answer, source = _answer_products(data)
+        if answer:
+            return answer, source
+    if terms and all(term in _PEOPLE_TERMS for term in terms):
+        answer, source = _answer_people(data)
+        if answer:
+            return answer, source
+    return _answer_table(data, terms)
+
+
+def answer_query(data, query):
+    """Answer from structured data, or None to fall back to the LLM; counts hits and misses"""
+    global _misses
+    answer, source = answer_from_data(data, query)
+    with _stats_lock:
+        if answer:
+            _hits[source] += 1
+        else:
+            _misses += 1
+    metrics.inc("structured_answers_total", result=source if answer else "miss")
+    return answer
+
+
+def fast_path_stats():
+    """Queries answered without the LLM, by source, and the overall hit rate"""
+    with _stats_lock:
+        hits = sum(_hits.values())
+        total = hits + _misses
+        return {
+            "queries": total,
+            "hits": hits,
+            "misses": _misses,
+            "hit_rate": hits / total if total else 0.0,
+            "sources": dict(_hits),
+        }
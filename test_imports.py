@@ -62,6 +62,13 @@ def test_functionality():
         print(f"❌ Functionality test failed: {e}")
         return False
 
+def test_lazy_backends():
+    """Importing the app modules must not load Selenium, langchain or bs4"""
+    lazy = ["selenium", "langchain_core", "langchain_ollama", "bs4"]
+    code = f"import scrape, parse, cli, sys; print([m for m in {lazy!r} if m in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]", f"imported eagerly: {output.strip()}"
+
 if __name__ == "__main__":
     print("🔍 Testing AI Web Scraper Dependencies...\n")
     
@@ -0,0 +1,79 @@
+"""Token estimates and per-model context budgets for LLM prompts."""
+import os
+import re
+import threading
+
+# Context windows (prompt + completion tokens) of the models offered in the UI
+MODEL_CONTEXT = {
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant": 131072,
+    "gemma2-9b-it": 8192,
+    "llama3": 8192,
+    "llama3.1": 131072,
+    "mistral": 32768,
+}
+DEFAULT_CONTEXT = 8192
+
+# Completion tokens reserved in every request
+OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "1024"))
+
+# Share of the remaining window actually filled, to absorb estimation error
+FILL_RATIO = 0.9
+
+_CJK = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    # tiktoken's cl100k_base is close to Llama 3's BPE vocabulary, not identical (Groq's usage has exact
+    # numbers); without it a heuristic counts CJK characters one by one so dense scripts are not undercounted
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # not installed, or the encoding file cannot be downloaded
+                _encoding = None
+            _encoding_loaded = True
+        return _encoding
+
+
+def estimate_tokens(text):
+    """Token count of ``text``: exact with tiktoken, otherwise a slightly pessimistic estimate"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    if text.isascii():
+        return len(text) // 4 + 1
+    # Roughly 1.5 tokens per CJK character and 2 characters per token for other scripts
+    cjk = len(_CJK.findall(text))
+    other = len(_NON_ASCII.findall(text)) - cjk
+    return (len(text) - cjk - other) // 4 + other // 2 + (cjk * 3) // 2 + 1
+
+
+def context_window(model_name, cap=None):
+    """Usable window of ``model_name``, optionally limited by ``cap`` (e.g. a per-request quota)"""
+    window = MODEL_CONTEXT.get(model_name, DEFAULT_CONTEXT)
+    return min(window, int(cap)) if cap else window
+
+
+def content_budget(model_name, overhead_tokens, output_tokens=OUTPUT_TOKENS, cap=None):
+    """Tokens of page content that fit next to the prompt (``overhead_tokens``) and the answer"""
+    available = context_window(model_name, cap) - overhead_tokens - output_tokens
+    return max(1, int(available * FILL_RATIO))
+
+
+def pack_content(text, budget_tokens):
+    """Longest prefix of ``text`` within ``budget_tokens``, cut at line (then sentence/word) boundaries"""
+    if not text or estimate_tokens(text) <= budget_tokens:
+        return text
+    from scrape import iter_dom_chunks
+
+    return next(iter_dom_chunks(text.split("\n"), budget_tokens, length_function=estimate_tokens), "")